@@ -0,0 +1,92 @@
+"""Fingerprinted static assets and response compression.
+
+asset_url() (a template global) links a file under static/ with a hash of its
+content in the query string; responses to such versioned URLs are cacheable
+for a year, since a changed file gets a new URL. Text responses are
+compressed with brotli when the client accepts it and the optional brotli
+package is installed, and with gzip otherwise.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import request, url_for
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is used without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html", "text/css", "text/plain", "text/csv",
+    "application/javascript", "text/javascript", "application/json",
+}
+ONE_YEAR = 365 * 24 * 60 * 60
+
+
+class Assets:
+    def __init__(self, app):
+        self.app = app
+        self.versions = {}  # filename -> content hash, computed once per process
+        self._fingerprint = None
+        app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+        app.jinja_env.globals["asset_url"] = self.url
+        app.after_request(self._after_request)
+
+    def version(self, filename):
+        if filename not in self.versions:
+            with open(os.path.join(self.app.static_folder, filename), "rb") as asset:
+                self.versions[filename] = hashlib.sha256(asset.read()).hexdigest()[:12]
+        return self.versions[filename]
+
+    def fingerprint(self):
+        """One hash over every file under static/, for validators of pages that link assets."""
+        if self._fingerprint is None:
+            for directory, _, filenames in os.walk(self.app.static_folder):
+                for filename in filenames:
+                    path = os.path.relpath(os.path.join(directory, filename), self.app.static_folder)
+                    self.version(path.replace(os.sep, "/"))
+            self._fingerprint = hashlib.sha1(repr(sorted(self.versions.items())).encode()).hexdigest()[:12]
+        return self._fingerprint
+
+    def url(self, filename):
+        return url_for("static", filename=filename, v=self.version(filename))
+
+    def _after_request(self, response):
+        if (request.endpoint == "static" and response.status_code in (200, 304) and "v" in request.args
+                and request.args["v"] == self.version(request.view_args["filename"])):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = ONE_YEAR
+            response.cache_control.immutable = True
+        return self._compress(response)
+
+    def _compress(self, response):
+        if (response.status_code != 200 or (response.is_streamed and not response.direct_passthrough)
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        accepted = request.accept_encodings
+        if brotli is not None and accepted["br"]:
+            encoding = "br"
+        elif accepted["gzip"]:
+            encoding = "gzip"
+        else:
+            return response
+        response.vary.add("Accept-Encoding")
+        # Static files are sent as a file wrapper; read them so they can be compressed
+        response.direct_passthrough = False
+        body = response.get_data()
+        if len(body) < self.app.config["COMPRESS_MIN_SIZE"]:
+            return response
+        if encoding == "br":
+            response.set_data(brotli.compress(body))
+        else:
+            response.set_data(gzip.compress(body, compresslevel=self.app.config["COMPRESS_LEVEL"], mtime=0))
+        response.headers["Content-Encoding"] = encoding
+        # The ETag was computed over the uncompressed body: keep it, but as a weak validator
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,128 @@
+"""Dashboard read latency while patients are being added concurrently, per storage profile.
+
+    python benchmarks/bench_concurrency.py [--readers 8] [--writers 4] [--seconds 5] [--patients 5000]
+
+Each profile runs in its own process against a fresh database file: reader
+threads load the dashboard in a loop while writer threads add patients.
+With the default profile readers queue behind the rollback-journal lock and
+writers can fail with "database is locked"; with the production profile (WAL,
+busy_timeout, read pool) reads should not stall behind writes.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+
+def run_worker(args):
+    sys.path.insert(0, ROOT)
+    from main import app, db, init_db, import_patients, Patient, User
+
+    with app.app_context():
+        init_db()
+        user = User(username="bench", email="bench@example.com", password="x")
+        db.session.add(user)
+        db.session.commit()
+        import_patients(user.id, (
+            dict(patient_id=f"SEED{i}", name=f"Seed {i}", gender="Female", blood_pressure="120/80",
+                 heart_rate=70, height=165, weight=70, waist=85, smoking="No", drinking="No", exercise="Yes")
+            for i in range(args.patients)
+        ))
+        user_id = user.id
+
+    stop = threading.Event()
+    read_latencies, write_latencies, failures = [], [], []
+
+    def client():
+        test_client = app.test_client()
+        with test_client.session_transaction() as http_session:
+            http_session["user_id"] = user_id
+        return test_client
+
+    def reader():
+        test_client = client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = test_client.get("/dashboard")
+            read_latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failures.append(response.status_code)
+
+    def writer(number):
+        test_client = client()
+        sequence = 0
+        while not stop.is_set():
+            sequence += 1
+            start = time.perf_counter()
+            test_client.post("/dashboard", data=dict(
+                add_patient="true", patient_id=f"W{number}-{sequence}", name="Writer", gender="Male",
+                blood_pressure="120/80", heart_rate="70", height="180", weight="80", waist="95",
+                smoking="No", drinking="No", exercise="Yes",
+            ))
+            write_latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        written = Patient.query.filter(Patient.patient_id.like("W%")).count()
+    print(json.dumps({
+        "reads_per_s": len(read_latencies) / args.seconds,
+        "read_p50_ms": percentile(read_latencies, 50) * 1000,
+        "read_p99_ms": percentile(read_latencies, 99) * 1000,
+        "read_max_ms": max(read_latencies, default=0) * 1000,
+        "writes_per_s": written / args.seconds,
+        "write_p99_ms": percentile(write_latencies, 99) * 1000,
+        "failed_writes": len(write_latencies) - written,
+        "failed_reads": len(failures),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--patients", type=int, default=5000, help="patients seeded before the run")
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return run_worker(args)
+
+    results = {}
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, STORAGE_PROFILE=profile,
+                       DATABASE_URL="sqlite:///" + os.path.join(directory, "bench.db"))
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", *sys.argv[1:]],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results[profile] = json.loads(output.strip().splitlines()[-1])
+
+    columns = list(next(iter(results.values())))
+    print(f"{'metric':<16}" + "".join(f"{profile:>14}" for profile in results))
+    for column in columns:
+        print(f"{column:<16}" + "".join(f"{results[profile][column]:>14.1f}" for profile in results))
+
+
+if __name__ == "__main__":
+    main()
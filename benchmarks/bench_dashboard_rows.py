@@ -0,0 +1,85 @@
+"""Dashboard read path: full Patient instances vs projected rows with a note preview.
+
+    python benchmarks/bench_dashboard_rows.py [--rows 10000 100000] [--note-length 500] [--iterations 20]
+
+Seeds one user per --rows size, each patient with a --note-length note,
+then reads a page of 50, a page of 500 and the user's whole patient list,
+once as Patient ORM instances (every column, identity map) and once
+through dashboard_rows() (displayed columns, note preview, plain rows).
+Reports the median latency and the tracemalloc peak of each read.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def measure(read, iterations):
+    """Median seconds and peak bytes allocated by read(), run in a fresh session each time."""
+    from main import db
+
+    timings = []
+    for _ in range(iterations):
+        db.session.remove()
+        start = time.perf_counter()
+        read()
+        timings.append(time.perf_counter() - start)
+    db.session.remove()
+    tracemalloc.start()
+    read()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.session.remove()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000], help="patients per user")
+    parser.add_argument("--note-length", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(directory, "bench.db")
+        from main import app, db, init_db, import_patients, dashboard_rows, paginate_patients, Patient, User
+
+        with app.app_context():
+            init_db()
+            users = {}
+            for size in args.rows:
+                user = User(username=f"rows{size}", email=f"rows{size}@example.com", password="x")
+                db.session.add(user)
+                db.session.commit()
+                note = ("Follow-up visit; " * (args.note_length // 17 + 1))[:args.note_length]
+                import_patients(user.id, (
+                    dict(patient_id=f"R{size}-{i}", name=f"Patient {i}", gender="Female", blood_pressure="120/80",
+                         heart_rate=70, height=165, weight=60 + i % 30, waist=75 + i % 30,
+                         smoking="No", drinking="No", exercise="Yes", note=note)
+                    for i in range(size)
+                ))
+                users[size] = user.id
+
+            print(f"{'rows':>8}{'read':>10}{'orm ms':>10}{'rows ms':>10}{'orm KiB':>10}{'rows KiB':>10}")
+            for size, user_id in users.items():
+                reads = {
+                    "page 50": lambda query: paginate_patients(query, per_page=50),
+                    "page 500": lambda query: paginate_patients(query, per_page=500),
+                    "all": lambda query: query.order_by(Patient.date_added.desc(), Patient.id.desc()).all(),
+                }
+                for name, read in reads.items():
+                    orm_time, orm_peak = measure(
+                        lambda: read(Patient.query.filter_by(user_id=user_id)), args.iterations)
+                    rows_time, rows_peak = measure(
+                        lambda: read(dashboard_rows(Patient.query.filter_by(user_id=user_id))), args.iterations)
+                    print(f"{size:>8}{name:>10}{orm_time * 1000:>10.2f}{rows_time * 1000:>10.2f}"
+                          f"{orm_peak / 1024:>10.0f}{rows_peak / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Translation overhead of the dashboard's {{ _('...') }} calls.
+
+    python benchmarks/bench_i18n.py [--iterations N] [--rows N] [--language tr]
+
+Renders dashboard.html with three template gettext implementations:
+an identity function (no translation, the floor), Flask-Babel's own
+callables (catalog looked up again on every call), and the app's cached
+translate(). Reports the render time and the translation cost per page and
+per _() call, relative to the floor.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask import render_template  # noqa: E402
+from flask_babel import get_translations  # noqa: E402
+
+from main import app, translate  # noqa: E402
+from bench_templates import fake_patients, time_per_call  # noqa: E402
+
+IMPLEMENTATIONS = {
+    "none": lambda message: message,
+    "flask-babel": lambda message: get_translations().ugettext(message),
+    "cached": translate,
+}
+
+
+def install(gettext):
+    app.jinja_env.install_gettext_callables(
+        gettext=gettext,
+        ngettext=lambda singular, plural, n: singular if n == 1 else plural,
+        newstyle=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=50, help="patient rows rendered on the dashboard")
+    parser.add_argument("--language", default="tr", help="Accept-Language of the simulated request")
+    args = parser.parse_args()
+
+    context = dict(patients=fake_patients(args.rows), search_query="", waist_result=None, waist_warning=None,
+                   next_cursor=None, prev_cursor=None, filter_args={}, summary=None)
+    with app.test_request_context("/dashboard", headers={"Accept-Language": args.language}):
+        calls = []
+        install(lambda message: calls.append(message) or message)
+        render_template("dashboard.html", **context)
+        print(f"{len(calls)} _() calls per page ({len(set(calls))} distinct messages), {args.rows} rows")
+
+        timings = {}
+        for name, gettext in IMPLEMENTATIONS.items():
+            install(gettext)
+            timings[name] = time_per_call(lambda: render_template("dashboard.html", **context), args.iterations)
+        install(translate)
+
+    print(f"{'gettext':<14}{'render ms':>12}{'i18n ms':>10}{'per call us':>14}")
+    for name, milliseconds in timings.items():
+        overhead = milliseconds - timings["none"]
+        print(f"{name:<14}{milliseconds:>12.3f}{overhead:>10.3f}{overhead / len(calls) * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Throughput and latency of every user-facing route against a seeded database.
+
+    python benchmarks/bench_routes.py [--users 20] [--patients-per-user 2000] [--requests 200]
+        [--concurrency 4] [--profile default] [--output results.json] [--baseline baseline.json]
+
+Seeds a fresh SQLite file in a temporary directory, then drives the real
+routes through the Flask test client: signup, login, dashboard list and
+search, add_patient, calculate_waist and delete_patient. Each scenario runs
+--requests requests spread over --concurrency threads, each thread logged in
+as its own seeded user. Prints throughput and p50/p95/p99 latency per
+scenario and optionally writes them as JSON.
+
+With --baseline, each scenario is compared against a previously saved
+results file, and the exit status is 1 if any p95 grew, or any throughput
+shrank, by more than --tolerance (default 25%). Runs offline.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+PASSWORD = "bench-password"
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+
+def patient_form(patient_id):
+    return dict(
+        add_patient="true", patient_id=patient_id, name="Bench Added", gender="Male",
+        blood_pressure="125/82", heart_rate="72", height="178", weight="84", waist="97",
+        smoking="No", drinking="Yes", exercise="Yes", note="Added by bench_routes",
+    )
+
+
+def seed(args):
+    """Create --users users with --patients-per-user patients each; return their ids and patient row ids."""
+    from werkzeug.security import generate_password_hash
+    from main import db, import_patients, Patient, User
+
+    password = generate_password_hash(PASSWORD)  # Hashed once: seeding should not be dominated by scrypt
+    users = [User(username=f"bench{u}", email=f"bench{u}@example.com", password=password) for u in range(args.users)]
+    db.session.add_all(users)
+    db.session.commit()
+    for user in users:
+        import_patients(user.id, (
+            dict(patient_id=f"B{user.id}-{i}", name=f"Patient {user.id}-{i}", gender=("Male", "Female")[i % 2],
+                 blood_pressure=f"{110 + i % 40}/{70 + i % 20}", heart_rate=60 + i % 40, height=150 + i % 40,
+                 weight=50 + i % 50, waist=70 + i % 45, smoking=("Yes", "No")[i % 3 > 0],
+                 drinking=("Yes", "No")[i % 4 > 0], exercise=("Yes", "No")[i % 2], note="Seeded")
+            for i in range(args.patients_per_user)
+        ))
+    patient_ids = {
+        user.id: [row.id for row in db.session.query(Patient.id).filter_by(user_id=user.id)]
+        for user in users
+    }
+    return [(user.id, user.email) for user in users], patient_ids
+
+
+def signup(client, worker):
+    username = f"signup{worker['number']}-{worker['next']()}"
+    return client.post("/signup", data=dict(username=username, email=f"{username}@example.com", password=PASSWORD))
+
+
+def scenarios(args):
+    """name -> request(client, worker) returning a response; every route is expected to answer < 400."""
+    return {
+        "signup": signup,
+        "login": lambda client, worker: client.post("/login", data=dict(email=worker["email"], password=PASSWORD)),
+        "dashboard": lambda client, worker: client.get("/dashboard"),
+        "dashboard_search": lambda client, worker: client.get("/dashboard", query_string=dict(search=args.search)),
+        "add_patient": lambda client, worker: client.post(
+            "/dashboard", data=patient_form(f"A{worker['number']}-{worker['next']()}")),
+        "calculate_waist": lambda client, worker: client.post("/dashboard", data=dict(
+            calculate_waist="true", age="40", gender="Female", height="165", weight="70", body_type="Normal")),
+        "delete_patient": lambda client, worker: client.get(f"/delete_patient/{worker['patients'].pop()}"),
+    }
+
+
+def run_scenario(request, workers, count):
+    latencies, errors = [], []
+    per_worker = max(1, count // len(workers))
+
+    def run(client, worker):
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            response = request(client, worker)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=run, args=worker) for worker in workers]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against baseline per scenario; return the names of regressed scenarios."""
+    regressed = []
+    print(f"\n{'vs baseline':<18}{'rps':>10}{'p95':>10}")
+    for name, current in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        rps_change = current["throughput_rps"] / previous["throughput_rps"] - 1
+        p95_change = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+        flag = rps_change < -tolerance or p95_change > tolerance
+        if flag:
+            regressed.append(name)
+        print(f"{name:<18}{rps_change:>+10.0%}{p95_change:>+10.0%}{'  REGRESSION' if flag else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--patients-per-user", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads, each logged in as its own user")
+    parser.add_argument("--scenarios", nargs="+", help="subset of scenarios to run, in the given order")
+    parser.add_argument("--search", default="Patient 1-1", help="dashboard_search query")
+    parser.add_argument("--profile", default="default", help="STORAGE_PROFILE to run against")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    if args.concurrency > args.users:
+        parser.error("--concurrency cannot exceed --users")
+    if args.requests // args.concurrency > args.patients_per_user:
+        parser.error("delete_patient needs --patients-per-user >= --requests / --concurrency")
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(directory, "bench.db")
+        os.environ["STORAGE_PROFILE"] = args.profile
+        from main import app, init_db
+
+        with app.app_context():
+            init_db()
+            start = time.perf_counter()
+            users, patient_ids = seed(args)
+            print(f"seeded {args.users} users x {args.patients_per_user} patients in {time.perf_counter() - start:.1f} s")
+
+        workers = []
+        for number, (user_id, email) in enumerate(users[:args.concurrency]):
+            client = app.test_client()
+            with client.session_transaction() as http_session:
+                http_session["user_id"] = user_id
+            sequence = iter(range(10 ** 9))
+            workers.append((client, dict(number=number, email=email, patients=patient_ids[user_id],
+                                         next=sequence.__next__)))
+
+        available = scenarios(args)
+        selected = args.scenarios or list(available)
+        results = {
+            "config": dict(vars(args), python=platform.python_version()),
+            "scenarios": {},
+        }
+        print(f"{'scenario':<18}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name in selected:
+            row = results["scenarios"][name] = run_scenario(available[name], workers, args.requests)
+            print(f"{name:<18}{row['requests']:>10}{row['errors']:>8}{row['throughput_rps']:>10.1f}"
+                  f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressed = compare(results, json.load(baseline), args.tolerance)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
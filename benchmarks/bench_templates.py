@@ -0,0 +1,63 @@
+"""Per-request render time: render_template_string vs the cached template layer.
+
+    python benchmarks/bench_templates.py [--iterations N] [--rows N]
+
+render_template_string compiles the Jinja source on every call; render_template
+looks the compiled template up in the environment's cache after the first call.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask import render_template, render_template_string  # noqa: E402
+
+from main import app, TEMPLATES  # noqa: E402
+
+
+def fake_patients(count):
+    return [
+        SimpleNamespace(
+            id=i, patient_id=f"P{i:06d}", name=f"Patient {i}", gender="Female", blood_pressure="120/80",
+            heart_rate=72, height=170.0, weight=70.0, waist=88.5, smoking=False,
+            drinking=False, exercise=True, note="Follow-up in 3 months", note_truncated=False,
+            date_added=datetime(2024, 1, 1), bmi=24.2, waist_height_ratio=0.521, waist_risk=True,
+        )
+        for i in range(count)
+    ]
+
+
+def time_per_call(render, iterations):
+    render()  # warm-up, also fills the template cache for the cached path
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=50, help="patient rows rendered on the dashboard")
+    args = parser.parse_args()
+
+    context = {
+        "dashboard.html": dict(patients=fake_patients(args.rows), search_query="", waist_result=None,
+                               waist_warning=None, next_cursor=None, prev_cursor=None, filter_args={},
+                               summary=None),
+    }
+    print(f"{'template':<16}{'from_string ms':>16}{'cached ms':>12}{'speedup':>10}")
+    with app.test_request_context("/"):
+        for name, source in TEMPLATES.items():
+            kwargs = context.get(name, {})
+            before = time_per_call(lambda: render_template_string(source, **kwargs), args.iterations)
+            after = time_per_call(lambda: render_template(name, **kwargs), args.iterations)
+            print(f"{name:<16}{before:>16.3f}{after:>12.3f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
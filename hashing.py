@@ -0,0 +1,80 @@
+"""Password hashing on a bounded worker pool.
+
+Hashing is deliberately slow, so a burst of logins could otherwise occupy
+every request thread. At most PASSWORD_HASH_WORKERS hashes run at once;
+a request that cannot get a worker within PASSWORD_HASH_TIMEOUT seconds
+gets HashingBusy, which the app answers with 503. Threads are enough here:
+werkzeug hashes through hashlib's scrypt/pbkdf2, which release the GIL.
+
+PASSWORD_HASH_METHOD is a werkzeug method string including its cost, such
+as "scrypt:32768:8:1" or "pbkdf2:sha256:600000". Hashes stored with other
+parameters are reported by needs_rehash() so they can be upgraded at login.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from metrics import TIME_BUCKETS
+
+
+class HashingBusy(Exception):
+    """No hashing worker became free within PASSWORD_HASH_TIMEOUT."""
+
+
+class PasswordHasher:
+    def __init__(self, app, metrics=None):
+        self.app = app
+        app.config.setdefault("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        app.config.setdefault("PASSWORD_HASH_WORKERS", os.cpu_count() or 1)
+        app.config.setdefault("PASSWORD_HASH_TIMEOUT", 2.0)
+        self._executor = self._slots = self._pid = None
+        self._prefixes = {}  # method -> the "method:cost" prefix of hashes it produces
+        self._lock = threading.Lock()
+        self._wait = self._duration = None
+        if metrics is not None:
+            self._wait = metrics.histogram(
+                "password_hash_wait_seconds", "Time spent waiting for a hashing worker.", TIME_BUCKETS, "operation")
+            self._duration = metrics.histogram(
+                "password_hash_duration_seconds", "Time spent hashing a password.", TIME_BUCKETS, "operation")
+
+    def hash(self, password):
+        return self._run("hash", generate_password_hash, password, self.app.config["PASSWORD_HASH_METHOD"])
+
+    def verify(self, stored_hash, password):
+        return self._run("verify", check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """Whether stored_hash was made with a method or cost other than PASSWORD_HASH_METHOD."""
+        method = self.app.config["PASSWORD_HASH_METHOD"]
+        if method not in self._prefixes:
+            # werkzeug fills in default costs ("scrypt" -> "scrypt:32768:8:1"); learn the full form once
+            self._prefixes[method] = self.hash("").split("$", 1)[0]
+        return stored_hash.split("$", 1)[0] != self._prefixes[method]
+
+    def _pool(self):
+        # Created lazily so that forked worker processes each get their own threads
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                workers = self.app.config["PASSWORD_HASH_WORKERS"]
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+                self._slots = threading.BoundedSemaphore(workers)
+                self._pid = os.getpid()
+            return self._executor, self._slots
+
+    def _run(self, operation, function, *args):
+        executor, slots = self._pool()
+        start = time.perf_counter()
+        if not slots.acquire(timeout=self.app.config["PASSWORD_HASH_TIMEOUT"]):
+            raise HashingBusy()
+        try:
+            started = time.perf_counter()
+            result = executor.submit(function, *args).result()
+        finally:
+            slots.release()
+        if self._duration is not None:
+            self._wait.observe(started - start, operation)
+            self._duration.observe(time.perf_counter() - started, operation)
+        return result
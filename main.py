@@ -1,16 +1,144 @@
-from flask import Flask, render_template_string, request, redirect, url_for, session, flash
+from flask import Flask, abort, render_template, request, redirect, url_for, session, flash, make_response, Response, stream_with_context, has_request_context, g
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from flask_sqlalchemy.session import Session
+from werkzeug.datastructures import MultiDict
+from datetime import datetime, timedelta, timezone
+from babel import support
 from flask_babel import Babel, gettext
+from flask_migrate import Migrate, stamp, upgrade
+from jinja2 import DictLoader
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import with_loader_criteria
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+import base64
+import click
+import collections
+import csv
+import hashlib
+import io
+import json
+import math
+import operator
+import os
+import sqlite3
+import time
+
+from assets import Assets
+from hashing import HashingBusy, PasswordHasher
+from metrics import Metrics
+from vitals import parse_blood_pressure, parse_flag, parse_heart_rate, parse_measurement
+from waist import WAIST_DATA, RISK_THRESHOLDS, estimate_waist, is_at_risk, estimate_batch, body_metrics, screen_batch
+from writequeue import WriteQueue
 
 app = Flask(__name__)
 app.secret_key = "supersecretkey"  # Replace with a secure key
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
+app.config['STORAGE_PROFILE'] = os.environ.get('STORAGE_PROFILE', 'default')  # See STORAGE_PROFILES
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['BABEL_DEFAULT_LOCALE'] = 'en'  # Default language: English
+app.config['PATIENTS_PER_PAGE'] = 50  # Rows per dashboard page
+app.config['MAX_PATIENTS_PER_PAGE'] = 500  # Upper bound for ?per_page=
+app.config['NOTE_PREVIEW_LENGTH'] = 80  # Characters of a note shown in the dashboard table
+app.config['EXPORT_BATCH_SIZE'] = 1000  # Rows fetched per round trip when exporting
+app.config['IMPORT_BATCH_SIZE'] = 5000  # Rows per executemany/transaction when importing
+app.config['MAX_ESTIMATE_BATCH'] = 100000  # Inputs accepted per waist estimate API call
+app.config['WRITE_COALESCING'] = os.environ.get('WRITE_COALESCING') == '1'  # Group-commit patient writes
+app.config['WRITE_BATCH_SIZE'] = 64  # Most mutations applied per group commit
+app.config['WRITE_BATCH_DELAY'] = 0.005  # Seconds to wait for more mutations before committing
+app.config['SOFT_DELETE'] = os.environ.get('SOFT_DELETE') == '1'  # Hide deleted patients; purge them later
+app.config['PURGE_BATCH_SIZE'] = 500  # Rows removed per transaction by purge-deleted-patients
+app.config['SCREEN_CHUNK_SIZE'] = 10000  # Patients read and scored per chunk by screen-patients
+app.config['TREND_POINTS'] = 200  # Default points in a measurement trend
+app.config['MAX_TREND_POINTS'] = 2000  # Upper bound for ?points=
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # werkzeug method and cost
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # Concurrent hashes
+app.config['PASSWORD_HASH_TIMEOUT'] = 2.0  # Seconds to wait for a free hashing worker before answering 503
+app.config['SLOW_REQUEST_SECONDS'] = float(os.environ.get('SLOW_REQUEST_SECONDS', 0)) or None  # Log slower requests with their SQL
+
+# SQLite storage profiles. "production" turns on WAL so readers never wait for the
+# writer, and routes GET requests to a separate read-only connection pool while
+# all writes share a single connection.
+STORAGE_PROFILES = {
+    "default": {
+        "pragmas": {},
+        "read_pool_size": 0,
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "busy_timeout": 5000,  # ms to wait for a lock before "database is locked"
+            "synchronous": "NORMAL",  # fsync at checkpoints only; safe with WAL
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # Negative means KiB: 64 MiB page cache
+            "temp_store": "MEMORY",
+        },
+        "read_pool_size": 8,
+    },
+}
+
+storage_profile = STORAGE_PROFILES[app.config['STORAGE_PROFILE']]
+app.config.setdefault('SQLITE_PRAGMAS', storage_profile["pragmas"])
+if storage_profile["read_pool_size"] and ":memory:" not in app.config['SQLALCHEMY_DATABASE_URI']:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {"pool_size": 1, "max_overflow": 0}
+    app.config['SQLALCHEMY_BINDS'] = {
+        "read": {
+            "url": app.config['SQLALCHEMY_DATABASE_URI'],
+            "pool_size": storage_profile["read_pool_size"],
+            "max_overflow": storage_profile["read_pool_size"],
+        },
+    }
+
+class RoutingSession(Session):
+    """Sends the queries of GET requests to the read-only engine when the profile has one.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the writer, so
+    GET views that write (delete_patient) still work.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not getattr(clause, "is_dml", False) and has_request_context()
+                and request.method in ("GET", "HEAD") and "read" in db.engines):
+            return db.engines["read"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+metrics = Metrics(app)
+assets = Assets(app)
+password_hasher = PasswordHasher(app, metrics)
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(error):
+    return gettext("The server is busy, please try again in a moment."), 503, {"Retry-After": "1"}
+
+def configure_sqlite_engine(engine, read_only):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in app.config['SQLITE_PRAGMAS'].items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+with app.app_context():
+    for bind_key, engine in db.engines.items():
+        if engine.dialect.name == "sqlite":
+            configure_sqlite_engine(engine, read_only=bind_key == "read")
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The FTS5 search table and its shadow tables are managed by migrations 0002 and 0009, not autogenerate
+    return not (type_ == "table" and name.startswith("patient_search"))
 
-db = SQLAlchemy(app)
+migrate = Migrate(
+    app, db,
+    directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"),
+    render_as_batch=True,
+    include_object=include_object,
+)
 babel = Babel(app, default_locale='en')
 app.config['BABEL_DEFAULT_LOCALE'] = 'en'
 app.config['BABEL_TRANSLATION_DIRECTORIES'] = 'translations'
@@ -22,19 +150,75 @@ LANGUAGES = {
 }
 
 def get_locale():
-    if 'language' in session:
-        return session['language']
-    return request.accept_languages.best_match(LANGUAGES.keys())
+    """The request's language: the one chosen on the site, else the best Accept-Language match.
+
+    Resolved once per request and kept in g; nothing global is modified.
+    """
+    locale = g.get("locale")
+    if locale is None:
+        locale = g.locale = (session.get('language')
+                             or request.accept_languages.best_match(LANGUAGES.keys())
+                             or app.config['BABEL_DEFAULT_LOCALE'])
+    return locale
 
 babel.init_app(app, locale_selector=get_locale)
 
-# Simulated Waist Data Based on Body Type
-WAIST_DATA = {
-    "Slim": 60,
-    "Normal": 70,
-    "Mild Obesity": 80,
-    "Obese": 90,
-}
+def load_catalogs():
+    """The compiled message catalog of every supported language, read once at startup."""
+    directory = os.path.join(app.root_path, app.config['BABEL_TRANSLATION_DIRECTORIES'])
+    return {language: support.Translations.load(directory, [language]) for language in LANGUAGES}
+
+CATALOGS = load_catalogs()
+# (locale, message) -> translation; template messages are literals, so this stays small
+TRANSLATION_CACHE = {}
+
+def catalog():
+    return CATALOGS.get(get_locale()) or CATALOGS[app.config['BABEL_DEFAULT_LOCALE']]
+
+def translate(message):
+    """Template _() and gettext(): a dict lookup once a message has been translated for the locale."""
+    key = (get_locale(), message)
+    try:
+        return TRANSLATION_CACHE[key]
+    except KeyError:
+        translation = TRANSLATION_CACHE[key] = catalog().ugettext(message)
+        return translation
+
+# Replace Flask-Babel's template callables, which look the catalog up again on every call
+app.jinja_env.install_gettext_callables(
+    gettext=translate,
+    ngettext=lambda singular, plural, n: catalog().ungettext(singular, plural, n),
+    pgettext=lambda context, message: catalog().upgettext(context, message),
+    npgettext=lambda context, singular, plural, n: catalog().unpgettext(context, singular, plural, n),
+    newstyle=True,
+)
+
+# Rendered static pages, keyed by (endpoint, locale)
+PAGE_CACHE = {}
+
+def cached_page(view):
+    """Serve a GET page from a per-locale cache with an ETag, answering 304 when it matches.
+
+    The cached pages depend only on the locale; they do not render flash
+    messages, so pending flashes do not bypass the cache.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET":
+            return view(*args, **kwargs)
+        key = (request.endpoint, get_locale())
+        entry = PAGE_CACHE.get(key)
+        if entry is None:
+            body = view(*args, **kwargs)
+            entry = PAGE_CACHE[key] = (body, hashlib.sha1(body.encode()).hexdigest())
+        body, etag = entry
+        response = make_response(body)
+        response.set_etag(etag)
+        # Always revalidate, so a language switch or a deploy is picked up
+        response.cache_control.no_cache = True
+        response.vary.update(("Cookie", "Accept-Language"))
+        return response.make_conditional(request)
+    return wrapper
 
 # User model
 class User(db.Model):
@@ -49,60 +233,557 @@ class Patient(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     patient_id = db.Column(db.String(20), nullable=False, unique=True)
     name = db.Column(db.String(100), nullable=False)
-    blood_pressure = db.Column(db.String(20), nullable=False)
-    heart_rate = db.Column(db.String(20), nullable=False)  # New Field
+    systolic = db.Column(db.Integer, nullable=True)  # mmHg
+    diastolic = db.Column(db.Integer, nullable=True)  # mmHg
+    heart_rate = db.Column(db.Integer, nullable=True)  # bpm
     height = db.Column(db.Float, nullable=False)  # New Field
     weight = db.Column(db.Float, nullable=False)  # New Field
     waist = db.Column(db.Float, nullable=False)
-    smoking = db.Column(db.String(10), nullable=False)
-    drinking = db.Column(db.String(10), nullable=False)
-    exercise = db.Column(db.String(10), nullable=False)
+    smoking = db.Column(db.Boolean, nullable=True)
+    drinking = db.Column(db.Boolean, nullable=True)
+    exercise = db.Column(db.Boolean, nullable=True)
     note = db.Column(db.Text, nullable=True)  # Free-text Note Field
     date_added = db.Column(db.DateTime, default=datetime.utcnow)  # Date Added Field
+    gender = db.Column(db.String(10), nullable=True)
+    # Derived at insert time by waist.body_metrics()
+    bmi = db.Column(db.Float, nullable=True)
+    waist_height_ratio = db.Column(db.Float, nullable=True)
+    waist_risk = db.Column(db.Boolean, nullable=True)
+    deleted_at = db.Column(db.DateTime, nullable=True)  # Set by soft delete; the row is purged later
+
+    __table_args__ = (
+        # Serves the dashboard's keyset pagination: WHERE user_id = ? ORDER BY date_added, id
+        db.Index('ix_patient_user_date_added', 'user_id', 'date_added', 'id'),
+        # Serve the dashboard's risk filters
+        db.Index('ix_patient_user_waist_risk', 'user_id', 'waist_risk'),
+        db.Index('ix_patient_user_bmi', 'user_id', 'bmi'),
+        db.Index('ix_patient_user_waist', 'user_id', 'waist'),
+        # Only soft-deleted rows are indexed; serves the purge
+        db.Index('ix_patient_deleted_at', 'deleted_at', sqlite_where=db.text('deleted_at IS NOT NULL')),
+    )
+
+    @hybrid_property
+    def blood_pressure(self):
+        """Blood pressure in the "systolic/diastolic" form the dashboard accepts and shows."""
+        if self.systolic is None or self.diastolic is None:
+            return None
+        return f"{self.systolic}/{self.diastolic}"
+
+    @blood_pressure.inplace.expression
+    @classmethod
+    def _blood_pressure_expression(cls):
+        return db.cast(cls.systolic, db.String) + "/" + db.cast(cls.diastolic, db.String)
+
+class Measurement(db.Model):
+    """One visit's vitals for a patient. Append-only; the first row holds the vitals entered at registration."""
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    height = db.Column(db.Float, nullable=False)
+    weight = db.Column(db.Float, nullable=False)
+    waist = db.Column(db.Float, nullable=False)
+    systolic = db.Column(db.Integer, nullable=True)
+    diastolic = db.Column(db.Integer, nullable=True)
+    heart_rate = db.Column(db.Integer, nullable=True)
+    bmi = db.Column(db.Float, nullable=True)
+    waist_height_ratio = db.Column(db.Float, nullable=True)
+
+    __table_args__ = (
+        # Serves the trend queries: WHERE patient_id = ? AND taken_at BETWEEN ? AND ?
+        db.Index('ix_measurement_patient_taken_at', 'patient_id', 'taken_at'),
+    )
+
+BASELINE_COLUMNS = ["height", "weight", "waist", "systolic", "diastolic", "heart_rate", "bmi", "waist_height_ratio"]
+
+def add_baseline_measurements(connection, criterion):
+    """Record the registration vitals of the patients matching criterion as their first measurement."""
+    connection.execute(db.insert(Measurement).from_select(
+        ["patient_id", "taken_at", *BASELINE_COLUMNS],
+        db.select(Patient.id, Patient.date_added, *[getattr(Patient, column) for column in BASELINE_COLUMNS])
+        .where(criterion),
+    ))
+
+write_queue = WriteQueue(
+    app, db,
+    max_batch=app.config['WRITE_BATCH_SIZE'],
+    max_delay=app.config['WRITE_BATCH_DELAY'],
+)
+
+def apply_write(operation):
+    """Run operation(session) and commit it, through the group-commit queue when WRITE_COALESCING is on."""
+    if app.config['WRITE_COALESCING']:
+        # Hand back this request's connection first: the writer thread may need
+        # it (the production profile has a single writer connection).
+        db.session.rollback()
+        return write_queue.submit(operation)
+    result = operation(db.session)
+    db.session.commit()
+    return result
+
+def unique_violation(error):
+    """The "table.column" named by a unique-constraint IntegrityError, or None for other failures."""
+    message = str(error.orig)
+    prefix = "UNIQUE constraint failed: "
+    if not message.startswith(prefix):
+        return None
+    return message[len(prefix):].split(",")[0].strip()
+
+def remove_patients(user_id, selection):
+    """Operation removing the user's patients whose ids are in selection (a list or an id subquery).
+
+    One UPDATE or DELETE covers all of them: with SOFT_DELETE the rows are
+    only stamped with deleted_at, to be purged later with their measurements.
+    The removed rows come back through RETURNING to be taken off the user's
+    summary. The operation returns how many were removed.
+    """
+    soft_delete = app.config['SOFT_DELETE']
+
+    def operation(session):
+        criteria = (Patient.user_id == user_id, Patient.id.in_(selection), Patient.deleted_at.is_(None))
+        if soft_delete:
+            statement = db.update(Patient).where(*criteria).values(deleted_at=datetime.utcnow())
+        else:
+            statement = db.delete(Patient).where(*criteria)
+        removed = session.execute(
+            statement.returning(Patient.id, Patient.user_id, Patient.waist,
+                                *[getattr(Patient, flag) for flag in SUMMARY_COUNTS]),
+            execution_options={"synchronize_session": False},
+        ).mappings().all()
+        if not soft_delete and removed:
+            session.execute(db.delete(Measurement).where(Measurement.patient_id.in_([row["id"] for row in removed])))
+        # Asked for by engine: inside a GET request a bare connection() would be the read-only one
+        update_summaries(session.connection(bind_arguments={"bind": db.engine}), removed, -1)
+        return len(removed)
+    return operation
+
+@event.listens_for(db.session, "do_orm_execute")
+def hide_deleted_patients(execute_state):
+    """Leave soft-deleted patients out of every ORM query, unless run with include_deleted=True."""
+    if (execute_state.is_select and not execute_state.is_column_load and not execute_state.is_relationship_load
+            and not execute_state.execution_options.get("include_deleted", False)):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(Patient, Patient.deleted_at.is_(None), include_aliases=True)
+        )
+
+def purge_deleted_patients(connection, cutoff, limit):
+    """Permanently delete up to limit patients soft-deleted before cutoff; returns how many."""
+    hidden = (db.select(Patient.id)
+              .where(Patient.deleted_at.is_not(None), Patient.deleted_at < cutoff)
+              .order_by(Patient.deleted_at)
+              .limit(limit))
+    ids = connection.scalars(hidden).all()
+    connection.execute(db.delete(Measurement).where(Measurement.patient_id.in_(ids)))
+    return connection.execute(db.delete(Patient).where(Patient.id.in_(ids))).rowcount
+
+# Patient flag -> UserSummary counter column
+SUMMARY_COUNTS = {
+    "waist_risk": "at_risk_count",
+    "smoking": "smoker_count",
+    "drinking": "drinker_count",
+    "exercise": "exerciser_count",
+}
+
+class UserSummary(db.Model):
+    """Per-user dashboard totals, updated in the same transaction as each patient insert and delete."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    patient_count = db.Column(db.Integer, nullable=False, default=0)
+    waist_sum = db.Column(db.Float, nullable=False, default=0)
+    at_risk_count = db.Column(db.Integer, nullable=False, default=0)
+    smoker_count = db.Column(db.Integer, nullable=False, default=0)
+    drinker_count = db.Column(db.Integer, nullable=False, default=0)
+    exerciser_count = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped by every change to the user's patients; the dashboard ETag is built from it
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+class WaistBucket(db.Model):
+    """Per-user histogram of waist measurements in whole-cm buckets, for percentiles without a scan."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+def update_summaries(connection, patients, sign):
+    """Add (sign=1) or remove (sign=-1) patients, given as mappings, from their users' summaries."""
+    totals, buckets = {}, collections.Counter()
+    for patient in patients:
+        total = totals.setdefault(patient["user_id"], dict(
+            patient_count=0, waist_sum=0.0, version=1, **dict.fromkeys(SUMMARY_COUNTS.values(), 0)
+        ))
+        total["patient_count"] += sign
+        total["waist_sum"] += sign * patient["waist"]
+        for flag, column in SUMMARY_COUNTS.items():
+            if patient.get(flag):
+                total[column] += sign
+        buckets[patient["user_id"], int(patient["waist"])] += sign
+    if not totals:
+        return
+    insert = sqlite_insert(UserSummary)
+    connection.execute(
+        insert.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={column: getattr(UserSummary, column) + getattr(insert.excluded, column)
+                  for column in next(iter(totals.values()))},
+        ),
+        [dict(user_id=user_id, **total) for user_id, total in totals.items()],
+    )
+    insert = sqlite_insert(WaistBucket)
+    connection.execute(
+        insert.on_conflict_do_update(
+            index_elements=["user_id", "bucket"],
+            set_={"count": WaistBucket.count + insert.excluded.count},
+        ),
+        [dict(user_id=user_id, bucket=bucket, count=count) for (user_id, bucket), count in buckets.items()],
+    )
+
+def summary_fields(patient):
+    return {field: getattr(patient, field) for field in ("user_id", "waist", *SUMMARY_COUNTS)}
+
+@event.listens_for(db.session, "after_flush")
+def update_summaries_after_flush(session, flush_context):
+    connection = session.connection()
+    new_patients = [obj for obj in session.new if isinstance(obj, Patient)]
+    if new_patients:
+        add_baseline_measurements(connection, Patient.id.in_([patient.id for patient in new_patients]))
+    update_summaries(connection, [summary_fields(obj) for obj in new_patients], 1)
+    update_summaries(connection, [summary_fields(obj) for obj in session.deleted if isinstance(obj, Patient)], -1)
+
+def rebuild_summaries(connection):
+    # Versions must keep increasing across a rebuild, or a stale dashboard ETag could match again
+    versions = connection.execute(db.select(UserSummary.user_id, UserSummary.version)).all()
+    connection.execute(db.delete(WaistBucket))
+    connection.execute(db.delete(UserSummary))
+    connection.exec_driver_sql(
+        "INSERT INTO user_summary (user_id, patient_count, waist_sum, at_risk_count, smoker_count, "
+        "drinker_count, exerciser_count) "
+        "SELECT user_id, COUNT(*), SUM(waist), SUM(COALESCE(waist_risk, 0)), SUM(COALESCE(smoking, 0)), "
+        "SUM(COALESCE(drinking, 0)), SUM(COALESCE(exercise, 0)) FROM patient "
+        "WHERE deleted_at IS NULL GROUP BY user_id"
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO waist_bucket (user_id, bucket, count) "
+        "SELECT user_id, CAST(waist AS INTEGER), COUNT(*) FROM patient "
+        "WHERE deleted_at IS NULL GROUP BY user_id, CAST(waist AS INTEGER)"
+    )
+    if versions:
+        insert = sqlite_insert(UserSummary)
+        connection.execute(
+            insert.on_conflict_do_update(index_elements=["user_id"], set_={"version": insert.excluded.version}),
+            [dict(user_id=user_id, patient_count=0, waist_sum=0, at_risk_count=0, smoker_count=0,
+                  drinker_count=0, exerciser_count=0, version=version + 1) for user_id, version in versions],
+        )
+
+def load_summary(user_id, percentiles=(50, 90)):
+    """Dashboard summary card values, read from the summary tables without touching patient rows."""
+    summary = db.session.get(UserSummary, user_id)
+    if summary is None or summary.patient_count <= 0:
+        return None
+    buckets = db.session.execute(
+        db.select(WaistBucket.bucket, WaistBucket.count)
+        .where(WaistBucket.user_id == user_id, WaistBucket.count > 0)
+        .order_by(WaistBucket.bucket)
+    ).all()
+    waist_percentiles, pending, seen = {}, list(percentiles), 0
+    for bucket, count in buckets:
+        seen += count
+        while pending and seen >= pending[0] / 100 * summary.patient_count:
+            waist_percentiles[pending.pop(0)] = bucket + 0.5  # Bucket midpoint
+    return {
+        "patient_count": summary.patient_count,
+        "waist_mean": round(summary.waist_sum / summary.patient_count, 1),
+        "waist_percentiles": waist_percentiles,
+        "at_risk_count": summary.at_risk_count,
+        "smoker_count": summary.smoker_count,
+        "drinker_count": summary.drinker_count,
+        "exerciser_count": summary.exerciser_count,
+    }
+
+# Turkish dotted/dotless I: "İ".lower() is "i̇" and "I".lower() is "i" rather
+# than "ı", so both are collapsed to a plain "i" before case folding.
+TURKISH_FOLD = str.maketrans({'İ': 'i', 'I': 'i', 'ı': 'i'})
+
+def fold_search_text(value):
+    return (value or '').translate(TURKISH_FOLD).casefold()
+
+@event.listens_for(Engine, "connect")
+def register_sqlite_functions(dbapi_connection, connection_record):
+    # The search index triggers call fold_search_text(), so every connection needs it
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("fold_search_text", 1, fold_search_text, deterministic=True)
+
+# The owner column scopes a MATCH to one user's rows. Trigrams need three
+# characters, and the "u" delimiters keep "u5u" from matching inside "u15u".
+def search_owner(user_id):
+    return f"u{user_id}u"
+
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS patient_search
+       USING fts5(owner, patient_id, name, tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_insert AFTER INSERT ON patient BEGIN
+           INSERT INTO patient_search (rowid, owner, patient_id, name)
+           VALUES (new.id, 'u' || new.user_id || 'u', fold_search_text(new.patient_id), fold_search_text(new.name));
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_update AFTER UPDATE OF user_id, patient_id, name ON patient BEGIN
+           UPDATE patient_search
+           SET owner = 'u' || new.user_id || 'u',
+               patient_id = fold_search_text(new.patient_id), name = fold_search_text(new.name)
+           WHERE rowid = old.id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_delete AFTER DELETE ON patient BEGIN
+           DELETE FROM patient_search WHERE rowid = old.id;
+       END""",
+]
+
+def ensure_search_index(connection):
+    """Create the FTS5 search table and its sync triggers. Returns True if it was missing."""
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'patient_search'"
+    ).first()
+    for statement in SEARCH_INDEX_DDL:
+        connection.exec_driver_sql(statement)
+    return exists is None
+
+def rebuild_search_index(connection):
+    connection.exec_driver_sql("DELETE FROM patient_search")
+    connection.exec_driver_sql(
+        "INSERT INTO patient_search (rowid, owner, patient_id, name) "
+        "SELECT id, 'u' || user_id || 'u', fold_search_text(patient_id), fold_search_text(name) FROM patient"
+    )
+
+def filter_by_search(query, search_query, user_id):
+    """Restrict a Patient query to user_id's rows whose patient_id or name contains search_query."""
+    term = fold_search_text(search_query.strip())
+    if len(term) >= 3:
+        # Trigram index: a quoted phrase matches any substring of three characters or more.
+        # Matching the owner too keeps the cost to the user's rows, not every user's matches.
+        phrase = '"' + term.replace('"', '""') + '"'
+        expression = f'owner : "{search_owner(user_id)}" AND {{patient_id name}} : {phrase}'
+        matches = db.text("SELECT rowid FROM patient_search WHERE patient_search MATCH :expression")
+        return query.filter(Patient.id.in_(matches.bindparams(expression=expression).columns(db.column('rowid'))))
+    # Too short for a trigram; scan the user's own rows instead
+    pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return query.filter(db.func.fold_search_text(Patient.patient_id).like(pattern, escape="\\")
+                        | db.func.fold_search_text(Patient.name).like(pattern, escape="\\"))
+
+PATIENT_FIELDS = [
+    "patient_id", "name", "gender", "blood_pressure", "heart_rate", "height", "weight", "waist",
+    "smoking", "drinking", "exercise", "note",
+]
+OPTIONAL_PATIENT_FIELDS = ("gender", "note")
+FIELD_PARSERS = {
+    "heart_rate": parse_heart_rate,
+    "height": parse_measurement,
+    "weight": parse_measurement,
+    "waist": parse_measurement,
+    "smoking": parse_flag,
+    "drinking": parse_flag,
+    "exercise": parse_flag,
+}
+
+def parse_patient_fields(data):
+    """Validate a submitted patient record and return its Patient column values.
+
+    Blood pressure is split into systolic/diastolic, and the derived BMI,
+    waist-to-height ratio and waist risk are filled in. Raises ValueError for
+    a missing required field, an unparseable value or an unknown gender.
+    """
+    fields = {}
+    for field in PATIENT_FIELDS:
+        value = data.get(field)
+        if value in (None, ""):
+            if field not in OPTIONAL_PATIENT_FIELDS:
+                raise ValueError(f"Missing field: {field}")
+            value = None
+        else:
+            value = FIELD_PARSERS.get(field, str)(value)
+        fields[field] = value
+    fields["systolic"], fields["diastolic"] = parse_blood_pressure(fields.pop("blood_pressure"))
+    if fields["gender"] is not None and fields["gender"] not in RISK_THRESHOLDS:
+        raise ValueError(f"Unknown gender: {fields['gender']}")
+    fields.update(body_metrics(fields["height"], fields["weight"], fields["waist"], fields["gender"]))
+    return fields
+
+RANGE_FILTERS = (
+    ("bmi_min", Patient.bmi, operator.ge),
+    ("bmi_max", Patient.bmi, operator.le),
+    ("waist_min", Patient.waist, operator.ge),
+    ("waist_max", Patient.waist, operator.le),
+)
+
+def apply_patient_filters(query, args, user_id):
+    """Apply the dashboard's search, at-risk and BMI/waist range filters from request args to user_id's patients.
+
+    Returns the filtered query and the active filters, for building links
+    that keep them.
+    """
+    filter_args = {}
+    search_query = args.get("search", "")
+    if search_query:
+        query = filter_by_search(query, search_query, user_id)
+        filter_args["search"] = search_query
+    if args.get("at_risk"):
+        query = query.filter(Patient.waist_risk.is_(True))
+        filter_args["at_risk"] = "1"
+    for name, column, compare in RANGE_FILTERS:
+        value = args.get(name, type=float)
+        if value is not None:
+            query = query.filter(compare(column, value))
+            filter_args[name] = value
+    return query, filter_args
+
+def parse_filter_object(data):
+    """Validate a JSON filter object and return it as args for apply_patient_filters.
+
+    Unlike query strings, which the dashboard reads leniently, a JSON filter
+    selects rows to delete, so anything that would silently widen it is an
+    error: an unknown name, a blank search, an at_risk other than true, a
+    range bound that is not a finite number, or no criteria at all. Raises
+    ValueError.
+    """
+    names = ["search", "at_risk", *[name for name, _, _ in RANGE_FILTERS]]
+    unknown = [name for name in data if name not in names]
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)} (expected {', '.join(names)})")
+    if not data:
+        raise ValueError("filter must contain at least one criterion")
+    args = MultiDict()
+    for name, value in data.items():
+        if name == "search":
+            if not isinstance(value, str) or not value.strip():
+                raise ValueError("search must be a non-empty string")
+            args[name] = value
+        elif name == "at_risk":
+            if value is not True:
+                raise ValueError("at_risk must be true")
+            args[name] = "1"
+        else:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"{name} must be a number")
+            args[name] = value
+    return args
+
+def encode_cursor(patient):
+    raw = f"{patient.date_added.isoformat()}|{patient.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_added, patient_id = raw.split("|")
+        return datetime.fromisoformat(date_added), int(patient_id)
+    except ValueError:
+        return None
+
+# Columns the dashboard table shows, read as plain rows rather than Patient instances
+DASHBOARD_COLUMNS = [
+    "id", "date_added", "patient_id", "name", "gender", "blood_pressure", "heart_rate",
+    "height", "weight", "waist", "waist_risk", "bmi", "smoking", "drinking", "exercise",
+]
+
+def dashboard_rows(query):
+    """Project query onto DASHBOARD_COLUMNS plus a note preview.
+
+    The rows are lightweight named tuples that skip the identity map. Only
+    the first NOTE_PREVIEW_LENGTH characters of each note are read;
+    note_truncated marks the rows whose full note the page loads on demand.
+    """
+    preview = app.config['NOTE_PREVIEW_LENGTH']
+    return query.with_entities(
+        *[getattr(Patient, column).label(column) for column in DASHBOARD_COLUMNS],
+        db.func.substr(Patient.note, 1, preview).label("note"),
+        (db.func.length(Patient.note) > preview).label("note_truncated"),
+    )
+
+def paginate_patients(query, after=None, before=None, per_page=50):
+    """Keyset pagination over (date_added, id), newest first.
+
+    Returns (patients, next_cursor, prev_cursor). Only per_page + 1 rows are
+    read regardless of how many patients match the query.
+    """
+    key = db.tuple_(Patient.date_added, Patient.id)
+    if before:
+        rows = (query.filter(key > before)
+                .order_by(Patient.date_added.asc(), Patient.id.asc())
+                .limit(per_page + 1).all())
+        has_more = len(rows) > per_page
+        patients = rows[:per_page][::-1]
+        next_cursor = encode_cursor(patients[-1]) if patients else None
+        prev_cursor = encode_cursor(patients[0]) if has_more else None
+    else:
+        if after:
+            query = query.filter(key < after)
+        rows = (query.order_by(Patient.date_added.desc(), Patient.id.desc())
+                .limit(per_page + 1).all())
+        has_more = len(rows) > per_page
+        patients = rows[:per_page]
+        next_cursor = encode_cursor(patients[-1]) if has_more else None
+        prev_cursor = encode_cursor(patients[0]) if after and patients else None
+    return patients, next_cursor, prev_cursor
+
+def requested_page_size(args):
+    """?per_page=, clamped to 1..MAX_PATIENTS_PER_PAGE."""
+    per_page = args.get("per_page", app.config['PATIENTS_PER_PAGE'], type=int)
+    return max(1, min(per_page, app.config['MAX_PATIENTS_PER_PAGE']))
 
 @app.route("/")
+@cached_page
 def home():
-    return render_template_string(HTML_HOME)
+    return render_template("home.html")
 
 @app.route("/set_language/<language>")
 def set_language(language=None):
     if language in LANGUAGES:
         session['language'] = language
-        babel.locale_selector_func = lambda: session.get('language', 'en')
     return redirect(url_for("dashboard"))
 
 @app.route("/signup", methods=["GET", "POST"])
+@cached_page
 def signup():
     if request.method == "POST":
         username = request.form.get("username")
         email = request.form.get("email")
-        password = generate_password_hash(request.form.get("password"))
-        if User.query.filter_by(email=email).first():
-            flash(gettext("Email already registered."), "danger")
-            return redirect(url_for("signup"))
-        if User.query.filter_by(username=username).first():
-            flash(gettext("Username already taken."), "danger")
-            return redirect(url_for("signup"))
+        password = password_hasher.hash(request.form.get("password"))
         user = User(username=username, email=email, password=password)
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as error:
+            db.session.rollback()
+            if unique_violation(error) == "user.email":
+                flash(gettext("Email already registered."), "danger")
+            elif unique_violation(error) == "user.username":
+                flash(gettext("Username already taken."), "danger")
+            else:
+                raise
+            return redirect(url_for("signup"))
         flash(gettext("Sign-Up successful! Please log in."), "success")
         return redirect(url_for("login"))
-    return render_template_string(HTML_SIGNUP)
+    return render_template("signup.html")
 
 @app.route("/login", methods=["GET", "POST"])
+@cached_page
 def login():
     if request.method == "POST":
         email = request.form.get("email")
         password = request.form.get("password")
-        user = User.query.filter_by(email=email).first()
-        if user and check_password_hash(user.password, password):
+        user = db.session.execute(
+            db.select(User.id, User.username, User.password).where(User.email == email)
+        ).first()
+        # Hand the connection back before the slow hash, as apply_write does: the
+        # production profile has a single writer connection shared by every POST
+        db.session.rollback()
+        if user and password_hasher.verify(user.password, password):
+            if password_hasher.needs_rehash(user.password):
+                # Stored with older hashing parameters: upgrade while we have the plain password
+                new_hash = password_hasher.hash(password)
+                db.session.execute(db.update(User).where(User.id == user.id).values(password=new_hash))
+                db.session.commit()
             session["user_id"] = user.id
             session["username"] = user.username
             flash(gettext("Logged in successfully."), "success")
             return redirect(url_for("dashboard"))
         flash(gettext("Invalid email or password."), "danger")
-    return render_template_string(HTML_LOGIN)
+    return render_template("login.html")
 
 @app.route("/logout")
 def logout():
@@ -113,49 +794,30 @@ def logout():
 
 @app.route("/dashboard", methods=["GET", "POST"])
 def dashboard():
-    print("Current language:", session.get('language'))
     if "user_id" not in session:
         return redirect(url_for("login"))
 
-    waist_result = session.get('waist_result')
-    waist_warning = session.get('waist_warning')
-    session.pop('waist_result', None)
-    session.pop('waist_warning', None)
+    # Only touch the session when there is a calculator result to show, so that
+    # ordinary GETs do not rewrite the session cookie
+    waist_result = waist_warning = None
+    if "waist_result" in session:
+        waist_result = session.pop('waist_result')
+        waist_warning = session.pop('waist_warning', None)
 
     if request.method == "POST":
         try:
             if "add_patient" in request.form:
                 # Add Patient Form Submission
-                patient_id = request.form.get("patient_id")
-                name = request.form.get("name")
-                blood_pressure = request.form.get("blood_pressure")
-                heart_rate = request.form.get("heart_rate")
-                height = float(request.form.get("height"))
-                weight = float(request.form.get("weight"))
-                waist = float(request.form.get("waist"))
-                smoking = request.form.get("smoking")
-                drinking = request.form.get("drinking")
-                exercise = request.form.get("exercise")
-                note = request.form.get("note")  # Free-text Note
-                if Patient.query.filter_by(patient_id=patient_id).first():
+                fields = parse_patient_fields(request.form)
+                user_id = session["user_id"]
+                try:
+                    apply_write(lambda s: s.add(Patient(user_id=user_id, **fields)))
+                except IntegrityError as error:
+                    db.session.rollback()
+                    if unique_violation(error) != "patient.patient_id":
+                        raise
                     flash(gettext("Patient ID already exists."), "danger")
                     return redirect(url_for("dashboard"))
-                patient = Patient(
-                    user_id=session["user_id"],
-                    patient_id=patient_id,
-                    name=name,
-                    blood_pressure=blood_pressure,
-                    heart_rate=heart_rate,
-                    height=height,
-                    weight=weight,
-                    waist=waist,
-                    smoking=smoking,
-                    drinking=drinking,
-                    exercise=exercise,
-                    note=note
-                )
-                db.session.add(patient)
-                db.session.commit()
                 flash(gettext("Patient record added successfully."), "success")
 
             elif "calculate_waist" in request.form:
@@ -173,16 +835,10 @@ def dashboard():
                     flash(gettext("Please select a valid body type."), "danger")
                     return redirect(url_for("dashboard"))
                 # Calculate waist measurement
-                base_waist = WAIST_DATA[body_type]
-                height_adjustment = (int(height) - 150) * 0.4  # 0.4 cm per 1 cm above 150
-                weight_adjustment = (int(weight) - 45) * 0.5  # 0.5 cm per 1 kg above 45
-                total_waist = base_waist + height_adjustment + weight_adjustment
-                session['waist_result'] = round(total_waist - 5, 1)  # Adjusted to reduce by 5 cm
+                session['waist_result'] = estimate_waist(body_type, int(height), int(weight))
                 # Determine cardiovascular risk warning
                 session['waist_warning'] = None
-                if gender == "Male" and session['waist_result'] >= 102:
-                    session['waist_warning'] = gettext("Your waist measurement indicates a risk of cardiovascular diseases. Consult a healthcare provider.")
-                elif gender == "Female" and session['waist_result'] >= 88:
+                if is_at_risk(gender, session['waist_result']):
                     session['waist_warning'] = gettext("Your waist measurement indicates a risk of cardiovascular diseases. Consult a healthcare provider.")
 
         except Exception as e:
@@ -190,26 +846,717 @@ def dashboard():
             flash(gettext(f"An error occurred: {str(e)}"), "danger")
         return redirect(url_for("dashboard"))
 
-    search_query = request.args.get("search", "")
-    query = Patient.query.filter_by(user_id=session["user_id"])
-    if search_query:
-        query = query.filter(Patient.patient_id.like(f"%{search_query}%") | Patient.name.like(f"%{search_query}%"))
-    patients = query.all()
-    return render_template_string(HTML_DASHBOARD, patients=patients, search_query=search_query, waist_result=waist_result, waist_warning=waist_warning)
+    # A page showing a one-off calculator result is never revalidated
+    etag = dashboard_etag(session["user_id"]) if waist_result is None else None
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        search_query = request.args.get("search", "")
+        query, filter_args = apply_patient_filters(
+            Patient.query.filter_by(user_id=session["user_id"]), request.args, session["user_id"])
+        patients, next_cursor, prev_cursor = paginate_patients(
+            dashboard_rows(query),
+            after=decode_cursor(request.args.get("after")),
+            before=decode_cursor(request.args.get("before")),
+            per_page=requested_page_size(request.args),
+        )
+        response = make_response(render_template("dashboard.html", patients=patients, search_query=search_query, waist_result=waist_result, waist_warning=waist_warning, next_cursor=next_cursor, prev_cursor=prev_cursor, filter_args=filter_args, summary=load_summary(session["user_id"])))
+    if etag is not None:
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        response.cache_control.private = True
+        response.vary.update(("Cookie", "Accept-Language"))
+    return response
+
+# Changes with every deploy of the code or its templates
+with open(__file__, "rb") as main_source, open(os.path.join(os.path.dirname(__file__), "waist.py"), "rb") as waist_source:
+    CODE_VERSION = hashlib.sha1(main_source.read() + waist_source.read()).hexdigest()
+
+def dashboard_etag(user_id):
+    """ETag for a dashboard GET, computed from user_summary alone without reading patient rows.
+
+    It covers everything the page depends on: the user's data version, the
+    locale, the query string (search, filters, page), page-size settings,
+    and the code and static asset versions.
+    """
+    version = db.session.scalar(db.select(UserSummary.version).where(UserSummary.user_id == user_id)) or 0
+    key = (user_id, version, str(get_locale()), sorted(request.args.items(multi=True)),
+           app.config['PATIENTS_PER_PAGE'], app.config['NOTE_PREVIEW_LENGTH'], CODE_VERSION, assets.fingerprint())
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+PatientAccessError = collections.namedtuple("PatientAccessError", "message status")
+
+def owned_patient(patient_id):
+    """(patient, None) for the session user's patient with this id, else (None, PatientAccessError).
+
+    The error is 404 for a missing patient and 403 for someone else's. HTML
+    views flash the message; API views return it as JSON.
+    """
+    patient = db.session.get(Patient, patient_id)
+    if patient is None:
+        return None, PatientAccessError(gettext("Patient not found."), 404)
+    if patient.user_id != session["user_id"]:
+        return None, PatientAccessError(gettext("You are not authorized to access this patient."), 403)
+    return patient, None
 
 @app.route("/delete_patient/<int:patient_id>")
 def delete_patient(patient_id):
     if "user_id" not in session:
         return redirect(url_for("login"))
-    patient = Patient.query.get_or_404(patient_id)
-    if patient.user_id != session["user_id"]:
-        flash(gettext("You are not authorized to delete this patient."), "danger")
+    patient, error = owned_patient(patient_id)
+    if error and error.status == 404:
+        abort(404)
+    if error:
+        flash(error.message, "danger")
         return redirect(url_for("dashboard"))
-    db.session.delete(patient)
-    db.session.commit()
+    apply_write(remove_patients(session["user_id"], [patient.id]))
     flash(gettext("Patient record deleted successfully."), "success")
     return redirect(url_for("dashboard"))
 
+EXPORT_COLUMNS = [
+    "patient_id", "name", "gender", "blood_pressure", "heart_rate", "height", "weight", "waist",
+    "smoking", "drinking", "exercise", "note", "bmi", "waist_height_ratio", "waist_risk", "date_added",
+]
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+@app.route("/export")
+def export_patients():
+    """Stream the user's patients as CSV or NDJSON without loading them all into memory."""
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    export_format = request.args.get("format", "csv")
+    try:
+        start = parse_date(request.args.get("start"))
+        end = parse_date(request.args.get("end"))
+    except ValueError:
+        flash(gettext("Invalid date range."), "danger")
+        return redirect(url_for("dashboard"))
+    if export_format not in ("csv", "ndjson"):
+        flash(gettext("Unsupported export format."), "danger")
+        return redirect(url_for("dashboard"))
+
+    query, _ = apply_patient_filters(Patient.query.filter_by(user_id=session["user_id"]), request.args, session["user_id"])
+    if start:
+        query = query.filter(Patient.date_added >= start)
+    if end:
+        query = query.filter(Patient.date_added < end + timedelta(days=1))  # end date is inclusive
+    rows = (query.with_entities(*[getattr(Patient, column) for column in EXPORT_COLUMNS])
+            .order_by(Patient.id)
+            .yield_per(app.config['EXPORT_BATCH_SIZE']))
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            # Booleans are written as the "Yes"/"No" values the form and import use
+            writer.writerow([yes_no(value) if isinstance(value, bool) else value for value in row[:-1]]
+                            + [row[-1].isoformat() if row[-1] else ""])
+            if buffer.tell() > 65536:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def generate_ndjson():
+        for row in rows:
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record["date_added"] = record["date_added"].isoformat() if record["date_added"] else None
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    if export_format == "csv":
+        body, mimetype = generate_csv(), "text/csv"
+    else:
+        body, mimetype = generate_ndjson(), "application/x-ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=patients.{export_format}"},
+    )
+
+def read_patient_records(stream, file_format):
+    """Yield patient records as dicts from a CSV, JSON array or NDJSON byte stream."""
+    if file_format == "csv":
+        yield from csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    elif file_format == "json":
+        yield from json.load(stream)
+    elif file_format == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+def import_patients(user_id, records, batch_size=None):
+    """Bulk-insert patient records for a user.
+
+    Rows are validated with parse_patient_fields and inserted with one
+    executemany per batch, each batch in its own transaction. Patient IDs
+    already stored are skipped by the insert itself (ON CONFLICT DO NOTHING),
+    so a concurrent import of the same ID cannot fail the batch. Returns a
+    report with the inserted count and the 1-based row numbers of duplicate
+    and invalid records.
+    """
+    batch_size = batch_size or app.config['IMPORT_BATCH_SIZE']
+    report = {"inserted": 0, "duplicates": [], "invalid": []}
+    seen = set()
+
+    def insert_batch(batch):
+        # Rows whose patient ID is taken (hidden rows included, until purged) are skipped, not returned
+        inserted = set(db.session.scalars(
+            sqlite_insert(Patient).on_conflict_do_nothing(index_elements=["patient_id"]).returning(Patient.patient_id),
+            [fields for _, fields in batch],
+        ))
+        rows = []
+        for row, fields in batch:
+            if fields["patient_id"] in inserted:
+                rows.append(fields)
+            else:
+                report["duplicates"].append({"row": row, "patient_id": fields["patient_id"]})
+        if rows:
+            add_baseline_measurements(db.session.connection(), Patient.patient_id.in_(inserted))
+            update_summaries(db.session.connection(), rows, 1)
+        db.session.commit()
+        report["inserted"] += len(rows)
+
+    batch = []
+    for row, record in enumerate(records, start=1):
+        try:
+            fields = parse_patient_fields(record)
+            if record.get("date_added"):
+                fields["date_added"] = datetime.fromisoformat(record["date_added"])
+        except (TypeError, ValueError, AttributeError) as e:
+            report["invalid"].append({"row": row, "error": str(e)})
+            continue
+        if fields["patient_id"] in seen:
+            report["duplicates"].append({"row": row, "patient_id": fields["patient_id"]})
+            continue
+        seen.add(fields["patient_id"])
+        fields["user_id"] = user_id
+        batch.append((row, fields))
+        if len(batch) >= batch_size:
+            insert_batch(batch)
+            batch = []
+    if batch:
+        insert_batch(batch)
+    return report
+
+@app.route("/import", methods=["POST"])
+def import_patients_upload():
+    """Bulk import from an uploaded CSV/JSON/NDJSON file; responds with the JSON report."""
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    upload = request.files.get("file")
+    if upload is None:
+        return {"error": gettext("No file uploaded.")}, 400
+    file_format = request.form.get("format") or upload.filename.rsplit(".", 1)[-1].lower()
+    try:
+        return import_patients(session["user_id"], read_patient_records(upload.stream, file_format))
+    except ValueError as e:
+        db.session.rollback()
+        return {"error": str(e)}, 400
+
+@app.cli.command("import-patients")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user", "username", required=True, help="Username that will own the imported patients.")
+@click.option("--format", "file_format", type=click.Choice(["csv", "json", "ndjson"]), help="Defaults to the file extension.")
+@click.option("--batch-size", type=int, help="Rows per insert batch.")
+def import_patients_command(path, username, file_format, batch_size):
+    """Bulk import patients from a CSV, JSON or NDJSON file."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No such user: {username}")
+    file_format = file_format or path.rsplit(".", 1)[-1].lower()
+    with open(path, "rb") as stream:
+        report = import_patients(user.id, read_patient_records(stream, file_format), batch_size)
+    click.echo(f"Inserted {report['inserted']} patients.")
+    for duplicate in report["duplicates"]:
+        click.echo(f"Row {duplicate['row']}: duplicate patient ID {duplicate['patient_id']}")
+    for invalid in report["invalid"]:
+        click.echo(f"Row {invalid['row']}: {invalid['error']}")
+
+API_PATIENT_FIELDS = ["id"] + EXPORT_COLUMNS
+
+def api_login_required(view):
+    """Answer 401 JSON, instead of redirecting to the login page, when there is no session."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if "user_id" not in session:
+            return {"error": gettext("Login required.")}, 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def patient_json(patient, fields=API_PATIENT_FIELDS):
+    """A patient (model instance or projected row) as a JSON-ready dict of the given fields."""
+    record = {field: getattr(patient, field) for field in fields}
+    if record.get("date_added"):
+        record["date_added"] = record["date_added"].isoformat()
+    return record
+
+def requested_fields(args):
+    """The ?fields= projection as a list of API_PATIENT_FIELDS; raises ValueError for unknown names."""
+    if not args.get("fields"):
+        return API_PATIENT_FIELDS
+    fields = [field.strip() for field in args["fields"].split(",") if field.strip()]
+    unknown = [field for field in fields if field not in API_PATIENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+@app.route("/api/v1/patients")
+@api_login_required
+def api_list_patients():
+    """One page of the user's patients, newest first, with the dashboard's search and filters.
+
+    ?fields= selects the returned columns; only those (plus the cursor key) are read.
+    """
+    try:
+        fields = requested_fields(request.args)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    query, _ = apply_patient_filters(Patient.query.filter_by(user_id=session["user_id"]), request.args, session["user_id"])
+    columns = dict.fromkeys(["id", "date_added", *fields])  # The cursor needs id and date_added
+    query = query.with_entities(*[getattr(Patient, column).label(column) for column in columns])
+    patients, next_cursor, prev_cursor = paginate_patients(
+        query,
+        after=decode_cursor(request.args.get("after")),
+        before=decode_cursor(request.args.get("before")),
+        per_page=requested_page_size(request.args),
+    )
+    return {
+        "patients": [patient_json(patient, fields) for patient in patients],
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+
+@app.route("/api/v1/patients/<int:patient_id>")
+@api_login_required
+def api_get_patient(patient_id):
+    patient, error = owned_patient(patient_id)
+    if error:
+        return {"error": error.message}, error.status
+    try:
+        return patient_json(patient, requested_fields(request.args))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+@app.route("/api/v1/patients", methods=["POST"])
+@api_login_required
+def api_create_patients():
+    """Create one patient from a JSON object, or many from a JSON array.
+
+    A single record answers 201 with the stored patient, 400 if invalid and
+    409 for a duplicate patient ID. An array is bulk-imported and answers
+    with the import report, as /import does.
+    """
+    data = request.get_json(silent=True)
+    user_id = session["user_id"]
+    if isinstance(data, list):
+        return import_patients(user_id, data)
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object or array of patient records"}, 400
+    try:
+        fields = parse_patient_fields(data)
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}, 400
+
+    def operation(session):
+        patient = Patient(user_id=user_id, **fields)
+        session.add(patient)
+        session.flush()
+        return patient.id
+
+    try:
+        patient_id = apply_write(operation)
+    except IntegrityError as error:
+        db.session.rollback()
+        if unique_violation(error) != "patient.patient_id":
+            raise
+        return {"error": gettext("Patient ID already exists.")}, 409
+    return patient_json(db.session.get(Patient, patient_id)), 201, {
+        "Location": url_for("api_get_patient", patient_id=patient_id),
+    }
+
+@app.route("/api/v1/patients/<int:patient_id>", methods=["DELETE"])
+@api_login_required
+def api_delete_patient(patient_id):
+    patient, error = owned_patient(patient_id)
+    if error:
+        return {"error": error.message}, error.status
+    apply_write(remove_patients(session["user_id"], [patient.id]))
+    return "", 204
+
+@app.route("/api/v1/patients/delete", methods=["POST"])
+@api_login_required
+def api_bulk_delete_patients():
+    """Remove the user's patients listed in {"ids": [...]}, or matching {"filter": {...}}, in one statement.
+
+    The filter takes the dashboard's filter names (search, at_risk, bmi_min,
+    ...), checked by parse_filter_object; given both, only listed patients
+    that match the filter are removed.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not ("ids" in data or "filter" in data):
+        return {"error": 'Expected {"ids": [...]} and/or {"filter": {...}}'}, 400
+    user_id = session["user_id"]
+    query = Patient.query.filter_by(user_id=user_id)
+    if "ids" in data:
+        if not isinstance(data["ids"], list) or not all(isinstance(i, int) for i in data["ids"]):
+            return {"error": "ids must be an array of integers"}, 400
+        query = query.filter(Patient.id.in_(data["ids"]))
+    if "filter" in data:
+        if not isinstance(data["filter"], dict):
+            return {"error": "filter must be an object"}, 400
+        try:
+            query, _ = apply_patient_filters(query, parse_filter_object(data["filter"]), user_id)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+    removed = apply_write(remove_patients(user_id, query.with_entities(Patient.id).statement))
+    return {"deleted": removed, "soft": app.config['SOFT_DELETE']}
+
+# Trend field -> decimal places its bucket averages are rounded to
+TREND_FIELDS = {
+    "waist": 1, "weight": 1, "height": 1, "bmi": 1, "waist_height_ratio": 3,
+    "systolic": 0, "diastolic": 0, "heart_rate": 0,
+}
+
+def parse_measurement_fields(data, patient):
+    """Validate a submitted measurement and return its Measurement column values.
+
+    waist and weight are required. height defaults to the patient's,
+    blood_pressure and heart_rate are optional, and taken_at (ISO 8601)
+    defaults to now. Raises ValueError for a missing or unparseable value.
+    """
+    fields = {}
+    for field in ("waist", "weight", "height", "heart_rate"):
+        value = data.get(field)
+        if value in (None, ""):
+            if field in ("waist", "weight"):
+                raise ValueError(f"Missing field: {field}")
+            value = patient.height if field == "height" else None
+        else:
+            value = FIELD_PARSERS[field](value)
+        fields[field] = value
+    if data.get("blood_pressure"):
+        fields["systolic"], fields["diastolic"] = parse_blood_pressure(data["blood_pressure"])
+    if data.get("taken_at"):
+        taken_at = datetime.fromisoformat(data["taken_at"])
+        if taken_at.tzinfo is not None:
+            taken_at = taken_at.astimezone(timezone.utc).replace(tzinfo=None)  # Stored as naive UTC
+        fields["taken_at"] = taken_at
+    metrics = body_metrics(fields["height"], fields["weight"], fields["waist"], patient.gender)
+    fields["bmi"], fields["waist_height_ratio"] = metrics["bmi"], metrics["waist_height_ratio"]
+    return fields
+
+def measurement_trend(patient_id, start, end, points, fields):
+    """A patient's measurements between start and end, downsampled in SQL to at most points rows.
+
+    The range is split into points equal time buckets and each returned row
+    holds a bucket's mean time, measurement count and field averages. A
+    range holding no more than points measurements comes back unaggregated.
+    Returns (rows, total measurements in range).
+    """
+    in_range = [Measurement.patient_id == patient_id]
+    if start:
+        in_range.append(Measurement.taken_at >= start)
+    if end:
+        in_range.append(Measurement.taken_at < end)
+    # Answered from ix_measurement_patient_taken_at alone
+    total, first, last = db.session.execute(
+        db.select(db.func.count(), db.func.min(Measurement.taken_at), db.func.max(Measurement.taken_at))
+        .where(*in_range)
+    ).one()
+    if total <= points:
+        bucket = Measurement.id
+    elif first == last:
+        bucket = Measurement.patient_id  # Constant across the range: a single bucket
+    else:
+        offset = db.func.julianday(Measurement.taken_at) - db.func.julianday(db.literal(first, db.DateTime))
+        span = (last - first).total_seconds() / 86400
+        bucket = db.func.min(db.cast(offset * (points / span), db.Integer), points - 1)  # last lands in the top bucket
+    averages = []
+    for field in fields:
+        average = db.func.round(db.func.avg(getattr(Measurement, field)), TREND_FIELDS[field])
+        averages.append((average if TREND_FIELDS[field] else db.cast(average, db.Integer)).label(field))
+    taken_at = db.func.strftime("%Y-%m-%dT%H:%M:%S", db.func.avg(db.func.julianday(Measurement.taken_at)))
+    rows = db.session.execute(
+        db.select(taken_at.label("taken_at"), db.func.count().label("count"), *averages)
+        .where(*in_range)
+        .group_by(bucket)
+        .order_by(db.text("taken_at"))
+    ).all()
+    return rows, total
+
+@app.route("/api/v1/patients/<int:patient_id>/measurements", methods=["POST"])
+@api_login_required
+def api_add_measurement(patient_id):
+    """Append a follow-up visit's vitals to a patient's measurement series; answers 201."""
+    patient, error = owned_patient(patient_id)
+    if error:
+        return {"error": error.message}, error.status
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}, 400
+    try:
+        fields = parse_measurement_fields(data, patient)
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}, 400
+
+    def operation(session):
+        measurement = Measurement(patient_id=patient_id, **fields)
+        session.add(measurement)
+        session.flush()
+        return measurement.id
+
+    measurement = db.session.get(Measurement, apply_write(operation))
+    record = {field: getattr(measurement, field) for field in ["id", "taken_at", *TREND_FIELDS]}
+    record["taken_at"] = record["taken_at"].isoformat()
+    return record, 201
+
+@app.route("/api/v1/patients/<int:patient_id>/measurements")
+@api_login_required
+def api_measurement_trend(patient_id):
+    """A patient's trend between ?start= and ?end= (inclusive dates), downsampled to ?points=.
+
+    The response is column arrays: taken_at, count (measurements averaged
+    into each point) and one array per field in ?fields= (default: all
+    TREND_FIELDS), plus the total number of measurements in the range.
+    """
+    patient, error = owned_patient(patient_id)
+    if error:
+        return {"error": error.message}, error.status
+    try:
+        start = parse_date(request.args.get("start"))
+        end = parse_date(request.args.get("end"))
+    except ValueError:
+        return {"error": "start and end must be dates (YYYY-MM-DD)"}, 400
+    fields = list(TREND_FIELDS)
+    if request.args.get("fields"):
+        fields = [field.strip() for field in request.args["fields"].split(",") if field.strip()]
+        unknown = [field for field in fields if field not in TREND_FIELDS]
+        if unknown:
+            return {"error": f"Unknown fields: {', '.join(unknown)}"}, 400
+    points = request.args.get("points", app.config['TREND_POINTS'], type=int)
+    points = max(1, min(points, app.config['MAX_TREND_POINTS']))
+    rows, total = measurement_trend(patient.id, start, end and end + timedelta(days=1), points, fields)
+    trend = {"measurements": total, "taken_at": [row.taken_at for row in rows], "count": [row.count for row in rows]}
+    for field in fields:
+        trend[field] = [getattr(row, field) for row in rows]
+    return trend
+
+@app.route("/api/v1/waist/estimate", methods=["POST"])
+@api_login_required
+def estimate_waist_batch():
+    """Estimate waists for column arrays: {"body_type": [...], "height": [...], "weight": [...], "gender": [...]}.
+
+    Batches are vectorized only when NumPy is installed. It is not a
+    dependency, so by default a batch runs as a per-row Python loop and
+    gets no speed-up over repeated single estimates, even at
+    MAX_ESTIMATE_BATCH inputs.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return {"error": "Expected a JSON object"}, 400
+    columns = [data.get(key) for key in ("body_type", "height", "weight", "gender")]
+    if not all(isinstance(column, list) for column in columns):
+        return {"error": "body_type, height, weight and gender must be arrays"}, 400
+    if len(columns[0]) > app.config['MAX_ESTIMATE_BATCH']:
+        return {"error": f"At most {app.config['MAX_ESTIMATE_BATCH']} inputs per call"}, 413
+    try:
+        waists, at_risk = estimate_batch(*columns)
+    except (TypeError, ValueError) as e:
+        return {"error": str(e)}, 400
+    return {"waist": waists, "at_risk": at_risk}
+
+@app.cli.command("purge-deleted-patients")
+@click.option("--batch-size", type=int, help="Rows removed per transaction [default: PURGE_BATCH_SIZE].")
+@click.option("--older-than", default=0, show_default=True, help="Only purge rows hidden at least this many minutes ago.")
+@click.option("--pause", default=0.05, show_default=True, help="Seconds between batches, so other writers get the lock.")
+def purge_deleted_patients_command(batch_size, older_than, pause):
+    """Permanently remove soft-deleted patients, in short transactions; suitable for cron."""
+    batch_size = batch_size or app.config['PURGE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(minutes=older_than)
+    purged = 0
+    while True:
+        with db.engine.begin() as connection:
+            removed = purge_deleted_patients(connection, cutoff, batch_size)
+        purged += removed
+        if removed < batch_size:
+            break
+        time.sleep(pause)
+    click.echo(f"Purged {purged} patients.")
+
+@app.cli.command("rebuild-summaries")
+def rebuild_summaries_command():
+    """Recompute every user's dashboard summary from the patient table."""
+    with db.engine.begin() as connection:
+        rebuild_summaries(connection)
+    click.echo("Summaries rebuilt.")
+
+@app.template_filter("yes_no")
+def yes_no(value):
+    return "" if value is None else "Yes" if value else "No"
+
+def init_db():
+    """Create or upgrade the database schema through the migrations."""
+    inspector = db.inspect(db.engine)
+    if inspector.has_table("patient") and not inspector.has_table("alembic_version"):
+        stamp(revision="0001")  # Created by db.create_all() before migrations existed
+    upgrade()
+
+@app.cli.command("backfill-derived-fields")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows updated per transaction.")
+def backfill_derived_fields_command(batch_size):
+    """Compute BMI, waist-to-height ratio and waist risk for rows that predate them."""
+    last_id, updated = 0, 0
+    while True:
+        rows = db.session.execute(
+            db.select(Patient.id, Patient.height, Patient.weight, Patient.waist, Patient.gender)
+            .where(Patient.id > last_id, Patient.bmi.is_(None))
+            .order_by(Patient.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(db.update(Patient), [
+            dict(id=row.id, **body_metrics(row.height, row.weight, row.waist, row.gender)) for row in rows
+        ])
+        db.session.commit()
+        last_id, updated = rows[-1].id, updated + len(rows)
+    if updated:
+        db.session.execute(db.update(UserSummary).values(version=UserSummary.version + 1))  # Dashboards changed
+        db.session.commit()
+    click.echo(f"Updated {updated} patients.")
+
+SCREENING_COLUMNS = ["id", "user_id", "patient_id", "gender", "height", "weight", "waist",
+                     "bmi", "waist_height_ratio", "waist_risk"]
+SCREENING_REPORT_COLUMNS = ["id", "patient_id", "user_id", "gender", "height", "weight", "waist",
+                            "bmi", "waist_height_ratio", "waist_risk", "bmi_out_of_range"]
+
+def read_screening_chunk(last_id, size):
+    """The next size patients after last_id in primary-key order, with the columns screening needs."""
+    return db.session.execute(
+        db.select(*[getattr(Patient, column) for column in SCREENING_COLUMNS])
+        .where(Patient.id > last_id)
+        .order_by(Patient.id)
+        .limit(size)
+    ).all()
+
+def store_screening(rows, results):
+    """Write back the derived fields that differ from the screening results; returns how many rows changed.
+
+    Waist risk flips are applied to the owners' at-risk counts, and every
+    owner with a changed row gets a new dashboard version.
+    """
+    changed, risk_deltas = [], collections.Counter()
+    for row, (bmi, ratio, risk, _) in zip(rows, results):
+        if (bmi, ratio, risk) != (row.bmi, row.waist_height_ratio, row.waist_risk):
+            changed.append(dict(id=row.id, bmi=bmi, waist_height_ratio=ratio, waist_risk=risk))
+            risk_deltas[row.user_id] += bool(risk) - bool(row.waist_risk)
+    if changed:
+        db.session.execute(db.update(Patient), changed)
+        db.session.connection().execute(
+            db.update(UserSummary)
+            .where(UserSummary.user_id == db.bindparam("owner"))
+            .values(at_risk_count=UserSummary.at_risk_count + db.bindparam("delta"), version=UserSummary.version + 1),
+            [dict(owner=user_id, delta=delta) for user_id, delta in risk_deltas.items()],
+        )
+    return len(changed)
+
+def save_checkpoint(path, state):
+    # Written to a temporary file and renamed, so a crash never leaves a torn checkpoint
+    with open(path + ".tmp", "w") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+    os.replace(path + ".tmp", path)
+
+@app.cli.command("screen-patients")
+@click.option("--report", type=click.Path(dir_okay=False), help="Write the flagged patients to this CSV file.")
+@click.option("--update", is_flag=True, help="Store recomputed BMI, waist-to-height ratio and waist risk where they differ.")
+@click.option("--bmi-min", default=18.5, show_default=True, help="Lowest BMI that is not flagged.")
+@click.option("--bmi-max", default=25.0, show_default=True, help="BMI from which patients are flagged.")
+@click.option("--chunk-size", type=int, help="Patients per chunk [default: SCREEN_CHUNK_SIZE].")
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Scoring processes.")
+@click.option("--checkpoint", default="screen-patients.checkpoint.json", show_default=True,
+              type=click.Path(dir_okay=False), help="Progress file the job resumes from.")
+@click.option("--restart", is_flag=True, help="Ignore an existing checkpoint and start from the first patient.")
+def screen_patients_command(report, update, bmi_min, bmi_max, chunk_size, workers, checkpoint, restart):
+    """Flag every patient at waist risk or outside the BMI range, in chunks scored by a process pool.
+
+    Patients are read in primary-key chunks, and at most two chunks per
+    worker are in flight, so memory stays flat however large the table is.
+    After each chunk the report is flushed or the updates are committed, and
+    the position is saved to --checkpoint; an interrupted run continues from
+    there when started again with the same options.
+    """
+    if not report and not update:
+        raise click.UsageError("Pass --report, --update or both.")
+    chunk_size = chunk_size or app.config['SCREEN_CHUNK_SIZE']
+    options = dict(report=report and os.path.abspath(report), update=update, bmi_min=bmi_min, bmi_max=bmi_max)
+    state = dict(options=options, last_id=0, screened=0, flagged=0, updated=0, report_size=0)
+    if os.path.exists(checkpoint) and not restart:
+        with open(checkpoint) as checkpoint_file:
+            state = json.load(checkpoint_file)
+        if state["options"] != options:
+            raise click.ClickException(f"{checkpoint} was written with other options; pass --restart to start over.")
+        click.echo(f"Resuming after patient {state['last_id']} ({state['screened']} screened).")
+
+    report_file = writer = None
+    if report:
+        report_file = open(report, "a", newline="", encoding="utf-8")
+        report_file.truncate(state["report_size"])  # Drop rows written after the last checkpoint
+        writer = csv.writer(report_file)
+        if not state["report_size"]:
+            writer.writerow(SCREENING_REPORT_COLUMNS)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending, last_id = collections.deque(), state["last_id"]
+            while True:
+                while last_id is not None and len(pending) < 2 * workers:
+                    rows = read_screening_chunk(last_id, chunk_size)
+                    db.session.commit()  # Ends the read transaction
+                    if not rows:
+                        last_id = None
+                        break
+                    last_id = rows[-1].id
+                    inputs = [(row.height, row.weight, row.waist, row.gender) for row in rows]
+                    pending.append((rows, pool.submit(screen_batch, inputs, bmi_min, bmi_max)))
+                if not pending:
+                    break
+                rows, future = pending.popleft()
+                results = future.result()
+                for row, (bmi, ratio, risk, bmi_out_of_range) in zip(rows, results):
+                    if risk or bmi_out_of_range:
+                        state["flagged"] += 1
+                        if writer:
+                            writer.writerow([row.id, row.patient_id, row.user_id, row.gender, row.height, row.weight,
+                                             row.waist, bmi, ratio, yes_no(risk), yes_no(bmi_out_of_range)])
+                if update:
+                    state["updated"] += store_screening(rows, results)
+                    db.session.commit()
+                if report_file:
+                    report_file.flush()
+                    state["report_size"] = report_file.tell()
+                state["last_id"] = rows[-1].id
+                state["screened"] += len(rows)
+                save_checkpoint(checkpoint, state)
+                click.echo(f"Screened {state['screened']} patients, {state['flagged']} flagged.")
+    finally:
+        if report_file:
+            report_file.close()
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)  # Finished; the next run starts from the first patient
+    click.echo(f"Done: {state['screened']} patients screened, {state['flagged']} flagged, {state['updated']} updated.")
+
+@app.cli.command("rebuild-search-index")
+def rebuild_search_index_command():
+    """Rebuild the patient search index from the patient table."""
+    with db.engine.begin() as connection:
+        ensure_search_index(connection)
+        rebuild_search_index(connection)
+    click.echo("Search index rebuilt.")
+
 # HTML Templates
 HTML_HOME = '''
 <!DOCTYPE html>
@@ -218,16 +1565,7 @@ HTML_HOME = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{{ _('Waist Measurement App') }}</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 0; padding: 0; }
-        .header { background: linear-gradient(135deg, #007bff, #28a745); color: white; text-align: center; padding: 20px; }
-        h1 { margin: 0; font-size: 2rem; }
-        p { margin: 10px 0; font-size: 1rem; }
-        .btn { padding: 10px 20px; background-color: #007bff; color: white; text-decoration: none; border-radius: 5px; transition: background 0.3s; }
-        .btn:hover { background-color: #0056b3; }
-        .container { max-width: 800px; margin: 20px auto; padding: 20px; background: white; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); border-radius: 10px; }
-        footer { text-align: center; margin-top: 20px; font-size: 0.9rem; color: #666; }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/site.css') }}">
 </head>
 <body>
     <div class="header">
@@ -237,7 +1575,7 @@ HTML_HOME = '''
         <a href="{{ url_for('signup') }}" class="btn">{{ _('Sign Up') }}</a>
         <a href="{{ url_for('login') }}" class="btn">{{ _('Login') }}</a>
     </div>
-    <div class="container">
+    <div class="container container-wide">
         <footer>
             {{ _('Developed by Dr. Phyo Paing Aye') }}
         </footer>
@@ -253,17 +1591,7 @@ HTML_SIGNUP = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{{ _('Sign-Up') }}</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 0; padding: 0; }
-        .header { background: linear-gradient(135deg, #007bff, #28a745); color: white; text-align: center; padding: 20px; }
-        h1 { margin: 0; font-size: 2rem; }
-        .container { max-width: 500px; margin: 20px auto; padding: 20px; background: white; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); border-radius: 10px; }
-        .form-group { margin-bottom: 15px; }
-        label { display: block; margin-bottom: 5px; font-weight: bold; }
-        input { width: 100%; padding: 8px; box-sizing: border-box; border: 1px solid #ddd; border-radius: 5px; }
-        .btn { padding: 10px 20px; background-color: #007bff; color: white; text-decoration: none; border-radius: 5px; transition: background 0.3s; }
-        .btn:hover { background-color: #0056b3; }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/site.css') }}">
 </head>
 <body>
     <div class="header">
@@ -297,17 +1625,7 @@ HTML_LOGIN = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{{ _('Login') }}</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 0; padding: 0; }
-        .header { background: linear-gradient(135deg, #007bff, #28a745); color: white; text-align: center; padding: 20px; }
-        h1 { margin: 0; font-size: 2rem; }
-        .container { max-width: 500px; margin: 20px auto; padding: 20px; background: white; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); border-radius: 10px; }
-        .form-group { margin-bottom: 15px; }
-        label { display: block; margin-bottom: 5px; font-weight: bold; }
-        input { width: 100%; padding: 8px; box-sizing: border-box; border: 1px solid #ddd; border-radius: 5px; }
-        .btn { padding: 10px 20px; background-color: #007bff; color: white; text-decoration: none; border-radius: 5px; transition: background 0.3s; }
-        .btn:hover { background-color: #0056b3; }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/site.css') }}">
 </head>
 <body>
     <div class="header">
@@ -337,129 +1655,7 @@ HTML_DASHBOARD = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{{ _('Patient Dashboard') }}</title>
-    <style>
-        .flag-icon {
-            font-size: 24px;
-            margin: 0 5px;
-            text-decoration: none;
-            cursor: pointer;
-        }
-        :root {
-            --bg-color: #ffffff;
-            --text-color: #000000;
-            --table-bg: #ffffff;
-            --table-border: #ddd;
-            --form-bg: #f9f9f9;
-        }
-
-        [data-theme="dark"] {
-            --bg-color: #1a1a1a;
-            --text-color: #ffffff;
-            --table-bg: #2d2d2d;
-            --table-border: #444;
-            --form-bg: #2d2d2d;
-        }
-
-        body { 
-            font-family: Arial, sans-serif; 
-            margin: 0; 
-            padding: 0;
-            background-color: var(--bg-color);
-            color: var(--text-color);
-        }
-        .header { 
-            background: linear-gradient(135deg, #007bff, #28a745); 
-            color: white; 
-            text-align: center; 
-            padding: 20px;
-            position: relative;
-        }
-
-        .theme-switch {
-            position: absolute;
-            top: 20px;
-            right: 20px;
-            display: flex;
-            align-items: center;
-        }
-
-        .theme-switch-label {
-            margin-right: 10px;
-            color: white;
-        }
-
-        .switch {
-            position: relative;
-            display: inline-block;
-            width: 60px;
-            height: 34px;
-        }
-
-        .switch input {
-            opacity: 0;
-            width: 0;
-            height: 0;
-        }
-
-        .slider {
-            position: absolute;
-            cursor: pointer;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background-color: #ccc;
-            transition: .4s;
-            border-radius: 34px;
-        }
-
-        .slider:before {
-            position: absolute;
-            content: "";
-            height: 26px;
-            width: 26px;
-            left: 4px;
-            bottom: 4px;
-            background-color: white;
-            transition: .4s;
-            border-radius: 50%;
-        }
-
-        input:checked + .slider {
-            background-color: #2196F3;
-        }
-
-        input:checked + .slider:before {
-            transform: translateX(26px);
-        }
-
-        table { 
-            width: 100%; 
-            border-collapse: collapse; 
-            margin-top: 20px;
-            background-color: var(--table-bg);
-        }
-
-        th, td { 
-            border: 1px solid var(--table-border); 
-            padding: 8px; 
-            text-align: left;
-        }
-        .btn { padding: 8px 16px; background-color: #007bff; color: white; text-decoration: none; border-radius: 5px; transition: background 0.3s; }
-        .btn-danger { background-color: #dc3545; }
-        .btn-danger:hover { background-color: #a71d2a; }
-        .btn-secondary { background-color: #6c757d; }
-        .btn-secondary:hover { background-color: #5a6268; }
-        .form-group { margin-bottom: 15px; }
-        label { display: block; margin-bottom: 5px; font-weight: bold; }
-        input, select, textarea { width: 100%; padding: 8px; box-sizing: border-box; border: 1px solid #ddd; border-radius: 5px; }
-        footer { text-align: center; margin-top: 20px; font-size: 0.9rem; color: #666; }
-        .side-by-side { display: flex; gap: 20px; margin-top: 20px; }
-        .side-by-side > div { flex: 1; padding: 20px; background: var(--form-bg); border: 1px solid var(--table-border); border-radius: 10px; }
-        @media (max-width: 768px) {
-            .side-by-side { flex-direction: column; }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/dashboard.css') }}">
 </head>
 <body>
     <div class="header">
@@ -483,7 +1679,15 @@ HTML_DASHBOARD = '''
         </div>
         <form action="{{ url_for('dashboard') }}" method="GET">
             <input type="text" name="search" placeholder="{{ _('Search by Patient ID or Name') }}" value="{{ search_query }}">
+            <div class="filters">
+                <label><input type="checkbox" name="at_risk" value="1" {% if filter_args.at_risk %}checked{% endif %}> {{ _('Only at-risk') }}</label>
+                <input type="number" step="0.1" name="bmi_min" placeholder="{{ _('BMI from') }}" value="{{ filter_args.bmi_min }}">
+                <input type="number" step="0.1" name="bmi_max" placeholder="{{ _('BMI to') }}" value="{{ filter_args.bmi_max }}">
+                <input type="number" step="0.1" name="waist_min" placeholder="{{ _('Waist from (cm)') }}" value="{{ filter_args.waist_min }}">
+                <input type="number" step="0.1" name="waist_max" placeholder="{{ _('Waist to (cm)') }}" value="{{ filter_args.waist_max }}">
+            </div>
             <button type="submit" class="btn">{{ _('Search') }}</button>
+            <a href="{{ url_for('export_patients', format='csv', **filter_args) }}" class="btn btn-secondary">{{ _('Export CSV') }}</a>
         </form>
         <div class="side-by-side">
             <div>
@@ -498,6 +1702,13 @@ HTML_DASHBOARD = '''
                         <label>{{ _('Name') }}:</label>
                         <input type="text" name="name" required>
                     </div>
+                    <div class="form-group">
+                        <label>{{ _('Gender') }}:</label>
+                        <select name="gender" required>
+                            <option value="Male">{{ _('Male') }}</option>
+                            <option value="Female">{{ _('Female') }}</option>
+                        </select>
+                    </div>
                     <div class="form-group">
                         <label>{{ _('Blood Pressure') }}:</label>
                         <input type="text" name="blood_pressure" required>
@@ -548,7 +1759,7 @@ HTML_DASHBOARD = '''
             </div>
             <div>
                 <h2>{{ _('Waist Measurement Calculator') }}</h2>
-                <form id="waistCalculatorForm" onsubmit="calculateWaist(event)">
+                <form id="waistCalculatorForm">
                     <div class="form-group">
                         <label>{{ _('Age (18-70)') }}:</label>
                         <input type="number" name="age" min="18" max="70" required>
@@ -583,47 +1794,22 @@ HTML_DASHBOARD = '''
                     <strong>{{ _('Estimated Waist Measurement') }}:</strong> <span id="waistMeasurement"></span> cm
                     <p id="waistWarning" style="color: red; display: none;"></p>
                 </div>
-                <script>
-                function calculateWaist(event) {
-                    event.preventDefault();
-                    const form = event.target;
-                    const formData = new FormData(form);
-
-                    const height = parseInt(formData.get('height'));
-                    const weight = parseInt(formData.get('weight'));
-                    const bodyType = formData.get('body_type');
-                    const gender = formData.get('gender');
-
-                    const waistData = {
-                        "Slim": 60,
-                        "Normal": 70,
-                        "Mild Obesity": 80,
-                        "Obese": 90
-                    };
-
-                    const baseWaist = waistData[bodyType];
-                    const heightAdjustment = (height - 150) * 0.4;
-                    const weightAdjustment = (weight - 45) * 0.5;
-                    const totalWaist = baseWaist + heightAdjustment + weightAdjustment;
-                    const waistResult = Math.round((totalWaist - 5) * 10) / 10;
-
-                    document.getElementById('waistMeasurement').textContent = waistResult;
-                    const warningElement = document.getElementById('waistWarning');
-
-                    if ((gender === 'Male' && waistResult >= 102) || 
-                        (gender === 'Female' && waistResult >= 88)) {
-                        warningElement.textContent = "{{ _('Your waist measurement indicates a risk of cardiovascular diseases. Consult a healthcare provider.') }}";
-                        warningElement.style.display = 'block';
-                    } else {
-                        warningElement.style.display = 'none';
-                    }
-
-                    document.getElementById('waistResult').style.display = 'block';
-                }
-                </script>
             </div>
         </div>
 
+        {% if summary %}
+        <div class="summary">
+            <div><strong>{{ summary.patient_count }}</strong>{{ _('Patients') }}</div>
+            <div><strong>{{ summary.waist_mean }}</strong>{{ _('Mean waist (cm)') }}</div>
+            <div><strong>{{ summary.waist_percentiles[50] }}</strong>{{ _('Median waist (cm)') }}</div>
+            <div><strong>{{ summary.waist_percentiles[90] }}</strong>{{ _('90th percentile waist (cm)') }}</div>
+            <div><strong>{{ summary.at_risk_count }}</strong>{{ _('At risk') }}</div>
+            <div><strong>{{ summary.smoker_count }}</strong>{{ _('Smokers') }}</div>
+            <div><strong>{{ summary.drinker_count }}</strong>{{ _('Drinkers') }}</div>
+            <div><strong>{{ summary.exerciser_count }}</strong>{{ _('Exercisers') }}</div>
+        </div>
+        {% endif %}
+
         <h2>{{ _('Patient History') }}</h2>
         <table>
             <thead>
@@ -631,11 +1817,13 @@ HTML_DASHBOARD = '''
                     <th>{{ _('Date Added') }}</th>
                     <th>{{ _('Patient ID') }}</th>
                     <th>{{ _('Name') }}</th>
+                    <th>{{ _('Gender') }}</th>
                     <th>{{ _('Blood Pressure') }}</th>
                     <th>{{ _('Heart Rate') }}</th>
                     <th>{{ _('Height (cm)') }}</th>
                     <th>{{ _('Weight (kg)') }}</th>
                     <th>{{ _('Waist (cm)') }}</th>
+                    <th>{{ _('BMI') }}</th>
                     <th>{{ _('Smoking') }}</th>
                     <th>{{ _('Drinking') }}</th>
                     <th>{{ _('Exercise') }}</th>
@@ -649,37 +1837,59 @@ HTML_DASHBOARD = '''
                     <td>{{ patient.date_added.strftime('%d.%m.%Y') }}</td>
                     <td>{{ patient.patient_id }}</td>
                     <td>{{ patient.name }}</td>
-                    <td>{{ patient.blood_pressure }}</td>
-                    <td>{{ patient.heart_rate }}</td>
+                    <td>{{ _(patient.gender) if patient.gender else '' }}</td>
+                    <td>{{ patient.blood_pressure or '' }}</td>
+                    <td>{{ patient.heart_rate if patient.heart_rate is not none else '' }}</td>
                     <td>{{ patient.height }}</td>
                     <td>{{ patient.weight }}</td>
-                    <td>{{ patient.waist }}</td>
-                    <td>{{ patient.smoking }}</td>
-                    <td>{{ patient.drinking }}</td>
-                    <td>{{ patient.exercise }}</td>
-                    <td>{{ patient.note }}</td>
+                    <td>{{ patient.waist }}{% if patient.waist_risk %} &#9888;{% endif %}</td>
+                    <td>{{ patient.bmi if patient.bmi is not none else '' }}</td>
+                    <td>{{ patient.smoking|yes_no }}</td>
+                    <td>{{ patient.drinking|yes_no }}</td>
+                    <td>{{ patient.exercise|yes_no }}</td>
+                    <td>
+                        <span class="note-text">{{ patient.note or '' }}{% if patient.note_truncated %}&hellip;{% endif %}</span>
+                        {% if patient.note_truncated %}<a href="#" class="note-more" data-url="{{ url_for('api_get_patient', patient_id=patient.id, fields='note') }}">{{ _('more') }}</a>{% endif %}
+                    </td>
                     <td><a href="{{ url_for('delete_patient', patient_id=patient.id) }}" class="btn btn-danger">{{ _('Delete') }}</a></td>
                 </tr>
                 {% endfor %}
             </tbody>
         </table>
+        <div class="pagination">
+            {% if prev_cursor %}
+            <a href="{{ url_for('dashboard', per_page=request.args.get('per_page'), before=prev_cursor, **filter_args) }}" class="btn btn-secondary">{{ _('Previous') }}</a>
+            {% endif %}
+            {% if next_cursor %}
+            <a href="{{ url_for('dashboard', per_page=request.args.get('per_page'), after=next_cursor, **filter_args) }}" class="btn btn-secondary">{{ _('Next') }}</a>
+            {% endif %}
+        </div>
         <footer>
             {{ _('Developed by Dr. Phyo Paing Aye') }}
         </footer>
     </div>
-    <script>
-        const themeToggle = document.getElementById('theme-toggle');
-        const html = document.documentElement;
-
-        themeToggle.addEventListener('change', () => {
-            html.dataset.theme = themeToggle.checked ? 'dark' : 'light';
-        });
-    </script>
+    <script type="application/json" id="dashboard-data">{{ {
+        "waistData": WAIST_DATA,
+        "riskThresholds": RISK_THRESHOLDS,
+        "riskWarning": _('Your waist measurement indicates a risk of cardiovascular diseases. Consult a healthcare provider.'),
+    }|tojson }}</script>
+    <script src="{{ asset_url('js/dashboard.js') }}"></script>
 </body>
 </html>
 '''
 
+# Templates are registered once and compiled on first use; Jinja's template
+# cache then serves the compiled code for every later request.
+TEMPLATES = {
+    "home.html": HTML_HOME,
+    "signup.html": HTML_SIGNUP,
+    "login.html": HTML_LOGIN,
+    "dashboard.html": HTML_DASHBOARD,
+}
+app.jinja_loader = DictLoader(TEMPLATES)
+app.jinja_env.globals.update(WAIST_DATA=WAIST_DATA, RISK_THRESHOLDS=RISK_THRESHOLDS)
+
 if __name__ == "__main__":
     with app.app_context():
-        db.create_all()
+        init_db()
     app.run(host="0.0.0.0", port=8080, debug=True)
\ No newline at end of file
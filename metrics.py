@@ -0,0 +1,155 @@
+"""Per-request instrumentation, exposed in the Prometheus text format at /metrics.
+
+For every request the app records, labelled by endpoint: wall time, the number
+of SQL statements and the time spent in them (SQLAlchemy cursor events), the
+time spent rendering templates (Flask template signals) and the response size.
+SQL run outside a request, such as by the write-queue thread, is not counted.
+
+When SLOW_REQUEST_SECONDS is set, requests slower than that are logged with
+the SQL statements they ran.
+
+The histograms live in process memory and are not shared. Under serve.py's
+preforked workers, /metrics reports only the worker that answers the scrape.
+"""
+import bisect
+import threading
+import time
+
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+MAX_LOGGED_STATEMENTS = 100
+UNINSTRUMENTED_ENDPOINTS = {"metrics", "static"}
+
+
+class Histogram:
+    """A Prometheus histogram with one series per value of a single label."""
+
+    def __init__(self, name, description, buckets, label="endpoint"):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}  # label value -> [count per bucket..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=""):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(label_value, ([0] * (len(self.buckets) + 1), 0))
+            counts[index] += 1
+            self._series[label_value] = (counts, total + value)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(series.items()):
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return "\n".join(lines)
+
+
+class Metrics:
+    def __init__(self, app):
+        self.app = app
+        self.histograms = []
+        self.request_duration = self.histogram(
+            "http_request_duration_seconds", "Wall time per request.", TIME_BUCKETS)
+        self.sql_statements = self.histogram(
+            "http_request_sql_statements", "SQL statements executed per request.", COUNT_BUCKETS)
+        self.sql_duration = self.histogram(
+            "http_request_sql_duration_seconds", "Time spent executing SQL per request.", TIME_BUCKETS)
+        self.template_duration = self.histogram(
+            "http_request_template_duration_seconds", "Time spent rendering templates per request.", TIME_BUCKETS)
+        self.response_size = self.histogram(
+            "http_response_size_bytes", "Response body size; streamed responses are not counted.", SIZE_BUCKETS)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._start_render, app)
+        template_rendered.connect(self._finish_render, app)
+        event.listen(Engine, "before_cursor_execute", self._start_statement)
+        event.listen(Engine, "after_cursor_execute", self._finish_statement)
+        app.add_url_rule("/metrics", "metrics", self.expose)
+
+    def histogram(self, name, description, buckets, label="endpoint"):
+        """Create a histogram that is included in the /metrics output."""
+        histogram = Histogram(name, description, buckets, label)
+        self.histograms.append(histogram)
+        return histogram
+
+    def expose(self):
+        body = "\n".join(histogram.expose() for histogram in self.histograms) + "\n"
+        return Response(body, mimetype="text/plain; version=0.0.4")
+
+    def _current(self):
+        return g.get("request_metrics") if has_request_context() else None
+
+    def _start_request(self):
+        if request.endpoint in UNINSTRUMENTED_ENDPOINTS:
+            return
+        g.request_metrics = {
+            "start": time.perf_counter(),
+            "sql_count": 0,
+            "sql_time": 0.0,
+            "template_time": 0.0,
+            "statements": [] if self.app.config.get("SLOW_REQUEST_SECONDS") else None,
+        }
+
+    def _finish_request(self, response):
+        current = self._current()
+        if current is None or request.endpoint is None:
+            return response
+        elapsed = time.perf_counter() - current["start"]
+        endpoint = request.endpoint
+        self.request_duration.observe(elapsed, endpoint)
+        self.sql_statements.observe(current["sql_count"], endpoint)
+        self.sql_duration.observe(current["sql_time"], endpoint)
+        self.template_duration.observe(current["template_time"], endpoint)
+        if not response.is_streamed and response.content_length is not None:
+            self.response_size.observe(response.content_length, endpoint)
+
+        threshold = self.app.config.get("SLOW_REQUEST_SECONDS")
+        if threshold and elapsed >= threshold:
+            statements = current["statements"] or []
+            self.app.logger.warning(
+                "Slow request %s %s (%s): %.1f ms, %d SQL statements in %.1f ms, templates %.1f ms%s",
+                request.method, request.full_path.rstrip("?"), endpoint, elapsed * 1000,
+                current["sql_count"], current["sql_time"] * 1000, current["template_time"] * 1000,
+                "".join(f"\n  [{ms:.1f} ms] {sql}" for ms, sql in statements),
+            )
+        return response
+
+    def _start_render(self, sender, template, context, **extra):
+        current = self._current()
+        if current is not None:
+            current["render_start"] = time.perf_counter()
+
+    def _finish_render(self, sender, template, context, **extra):
+        current = self._current()
+        if current is not None and "render_start" in current:
+            current["template_time"] += time.perf_counter() - current.pop("render_start")
+
+    def _start_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if self._current() is not None:
+            conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+    def _finish_statement(self, conn, cursor, statement, parameters, context, executemany):
+        current = self._current()
+        if current is None or not conn.info.get("statement_start"):
+            return
+        elapsed = time.perf_counter() - conn.info["statement_start"].pop()
+        current["sql_count"] += 1
+        current["sql_time"] += elapsed
+        if current["statements"] is not None and len(current["statements"]) < MAX_LOGGED_STATEMENTS:
+            current["statements"].append((elapsed * 1000, " ".join(statement.split())))
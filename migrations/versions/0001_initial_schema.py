@@ -0,0 +1,54 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+Databases created with db.create_all() before migrations were introduced
+are stamped at this revision by init_db().
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('password', sa.String(length=200), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table('patient',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.String(length=20), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('blood_pressure', sa.String(length=20), nullable=False),
+        sa.Column('heart_rate', sa.String(length=20), nullable=False),
+        sa.Column('height', sa.Float(), nullable=False),
+        sa.Column('weight', sa.Float(), nullable=False),
+        sa.Column('waist', sa.Float(), nullable=False),
+        sa.Column('smoking', sa.String(length=10), nullable=False),
+        sa.Column('drinking', sa.String(length=10), nullable=False),
+        sa.Column('exercise', sa.String(length=10), nullable=False),
+        sa.Column('note', sa.Text(), nullable=True),
+        sa.Column('date_added', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('patient_id')
+    )
+
+
+def downgrade():
+    op.drop_table('patient')
+    op.drop_table('user')
@@ -0,0 +1,49 @@
+"""search and pagination indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:10:00.000000
+
+Adds the (user_id, date_added, id) index used by dashboard pagination and
+the patient_search FTS5 table with its sync triggers. Both may already
+exist on databases that ran init_db() before migrations were introduced.
+The triggers call fold_search_text(), which the app registers on every
+SQLite connection.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE INDEX IF NOT EXISTS ix_patient_user_date_added ON patient (user_id, date_added, id)")
+    op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS patient_search
+                  USING fts5(patient_id, name, tokenize='trigram')""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_insert AFTER INSERT ON patient BEGIN
+                      INSERT INTO patient_search (rowid, patient_id, name)
+                      VALUES (new.id, fold_search_text(new.patient_id), fold_search_text(new.name));
+                  END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_update AFTER UPDATE OF patient_id, name ON patient BEGIN
+                      UPDATE patient_search
+                      SET patient_id = fold_search_text(new.patient_id), name = fold_search_text(new.name)
+                      WHERE rowid = old.id;
+                  END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_delete AFTER DELETE ON patient BEGIN
+                      DELETE FROM patient_search WHERE rowid = old.id;
+                  END""")
+    op.execute("DELETE FROM patient_search")
+    op.execute("INSERT INTO patient_search (rowid, patient_id, name) "
+               "SELECT id, fold_search_text(patient_id), fold_search_text(name) FROM patient")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS patient_search_delete")
+    op.execute("DROP TRIGGER IF EXISTS patient_search_update")
+    op.execute("DROP TRIGGER IF EXISTS patient_search_insert")
+    op.execute("DROP TABLE IF EXISTS patient_search")
+    op.execute("DROP INDEX IF EXISTS ix_patient_user_date_added")
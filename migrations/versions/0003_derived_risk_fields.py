@@ -0,0 +1,55 @@
+"""derived risk fields
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:20:00.000000
+
+Adds patient gender and the persisted BMI, waist-to-height ratio and waist
+risk columns with their indexes. Existing rows are left NULL here so the
+upgrade stays a quick schema change; fill them in with
+`flask backfill-derived-fields`, which works in committed chunks.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('gender', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('bmi', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('waist_height_ratio', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('waist_risk', sa.Boolean(), nullable=True))
+        batch_op.create_index('ix_patient_user_waist_risk', ['user_id', 'waist_risk'], unique=False)
+        batch_op.create_index('ix_patient_user_bmi', ['user_id', 'bmi'], unique=False)
+        batch_op.create_index('ix_patient_user_waist', ['user_id', 'waist'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.drop_index('ix_patient_user_waist')
+        batch_op.drop_index('ix_patient_user_bmi')
+        batch_op.drop_index('ix_patient_user_waist_risk')
+        batch_op.drop_column('waist_risk')
+        batch_op.drop_column('waist_height_ratio')
+        batch_op.drop_column('bmi')
+        batch_op.drop_column('gender')
+    # Dropping columns recreates the table, which drops its search triggers
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_insert AFTER INSERT ON patient BEGIN
+                      INSERT INTO patient_search (rowid, patient_id, name)
+                      VALUES (new.id, fold_search_text(new.patient_id), fold_search_text(new.name));
+                  END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_update AFTER UPDATE OF patient_id, name ON patient BEGIN
+                      UPDATE patient_search
+                      SET patient_id = fold_search_text(new.patient_id), name = fold_search_text(new.name)
+                      WHERE rowid = old.id;
+                  END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_delete AFTER DELETE ON patient BEGIN
+                      DELETE FROM patient_search WHERE rowid = old.id;
+                  END""")
@@ -0,0 +1,133 @@
+"""typed vitals
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:30:00.000000
+
+Splits the free-text blood_pressure into integer systolic/diastolic
+columns, stores heart_rate as an integer and the smoking/drinking/exercise
+"Yes"/"No" strings as booleans. Legacy values are parsed in batches; a
+value that cannot be parsed is stored as NULL and its original text is
+appended to the patient's note so nothing is lost.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from vitals import parse_blood_pressure, parse_flag, parse_heart_rate
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+FLAGS = ("smoking", "drinking", "exercise")
+
+SEARCH_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS patient_search_insert AFTER INSERT ON patient BEGIN
+           INSERT INTO patient_search (rowid, patient_id, name)
+           VALUES (new.id, fold_search_text(new.patient_id), fold_search_text(new.name));
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_update AFTER UPDATE OF patient_id, name ON patient BEGIN
+           UPDATE patient_search
+           SET patient_id = fold_search_text(new.patient_id), name = fold_search_text(new.name)
+           WHERE rowid = old.id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS patient_search_delete AFTER DELETE ON patient BEGIN
+           DELETE FROM patient_search WHERE rowid = old.id;
+       END""",
+]
+
+
+def parse_or_none(parse, value):
+    try:
+        return parse(value)
+    except ValueError:
+        return None
+
+
+def convert_row(row):
+    values = {"id": row.id, "note": row.note}
+    unparsed = []
+    values["systolic"], values["diastolic"] = parse_or_none(parse_blood_pressure, row.blood_pressure) or (None, None)
+    if values["systolic"] is None and row.blood_pressure:
+        unparsed.append(f"blood pressure: {row.blood_pressure}")
+    values["heart_rate_bpm"] = parse_or_none(parse_heart_rate, row.heart_rate)
+    if values["heart_rate_bpm"] is None and row.heart_rate:
+        unparsed.append(f"heart rate: {row.heart_rate}")
+    for flag in FLAGS:
+        values[f"{flag}_flag"] = parse_or_none(parse_flag, getattr(row, flag))
+        if values[f"{flag}_flag"] is None and getattr(row, flag):
+            unparsed.append(f"{flag}: {getattr(row, flag)}")
+    if unparsed:
+        legacy = "[Legacy " + "; ".join(unparsed) + "]"
+        values["note"] = f"{row.note}\n{legacy}" if row.note else legacy
+    return values
+
+
+def upgrade():
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('systolic', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('diastolic', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('heart_rate_bpm', sa.Integer(), nullable=True))
+        for flag in FLAGS:
+            batch_op.add_column(sa.Column(f'{flag}_flag', sa.Boolean(), nullable=True))
+
+    connection = op.get_bind()
+    select = sa.text("SELECT id, blood_pressure, heart_rate, smoking, drinking, exercise, note "
+                     "FROM patient WHERE id > :last_id ORDER BY id LIMIT :limit")
+    update = sa.text("UPDATE patient SET systolic = :systolic, diastolic = :diastolic, "
+                     "heart_rate_bpm = :heart_rate_bpm, smoking_flag = :smoking_flag, "
+                     "drinking_flag = :drinking_flag, exercise_flag = :exercise_flag, note = :note "
+                     "WHERE id = :id")
+    last_id = 0
+    while True:
+        rows = connection.execute(select, {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        connection.execute(update, [convert_row(row) for row in rows])
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.drop_column('blood_pressure')
+        batch_op.drop_column('heart_rate')
+        for flag in FLAGS:
+            batch_op.drop_column(flag)
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.alter_column('heart_rate_bpm', new_column_name='heart_rate')
+        for flag in FLAGS:
+            batch_op.alter_column(f'{flag}_flag', new_column_name=flag)
+    # Recreating the table drops its search triggers
+    for statement in SEARCH_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade():
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blood_pressure_text', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('heart_rate_text', sa.String(length=20), nullable=True))
+        for flag in FLAGS:
+            batch_op.add_column(sa.Column(f'{flag}_text', sa.String(length=10), nullable=True))
+    op.execute("UPDATE patient SET "
+               "blood_pressure_text = COALESCE(systolic || '/' || diastolic, ''), "
+               "heart_rate_text = COALESCE(CAST(heart_rate AS TEXT), ''), "
+               + ", ".join(f"{flag}_text = CASE {flag} WHEN 1 THEN 'Yes' WHEN 0 THEN 'No' ELSE '' END"
+                           for flag in FLAGS))
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.drop_column('systolic')
+        batch_op.drop_column('diastolic')
+        batch_op.drop_column('heart_rate')
+        for flag in FLAGS:
+            batch_op.drop_column(flag)
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.alter_column('blood_pressure_text', new_column_name='blood_pressure',
+                              existing_type=sa.String(length=20), nullable=False)
+        batch_op.alter_column('heart_rate_text', new_column_name='heart_rate',
+                              existing_type=sa.String(length=20), nullable=False)
+        for flag in FLAGS:
+            batch_op.alter_column(f'{flag}_text', new_column_name=flag,
+                                  existing_type=sa.String(length=10), nullable=False)
+    for statement in SEARCH_TRIGGERS:
+        op.execute(statement)
@@ -0,0 +1,55 @@
+"""user summaries
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 09:40:00.000000
+
+Adds the per-user dashboard summary and waist histogram tables and fills
+them from the existing patients. From then on the app keeps them up to
+date incrementally; `flask rebuild-summaries` recomputes them for repair.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_summary',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('patient_count', sa.Integer(), nullable=False),
+        sa.Column('waist_sum', sa.Float(), nullable=False),
+        sa.Column('at_risk_count', sa.Integer(), nullable=False),
+        sa.Column('smoker_count', sa.Integer(), nullable=False),
+        sa.Column('drinker_count', sa.Integer(), nullable=False),
+        sa.Column('exerciser_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('waist_bucket',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'bucket')
+    )
+    op.execute(
+        "INSERT INTO user_summary (user_id, patient_count, waist_sum, at_risk_count, smoker_count, "
+        "drinker_count, exerciser_count) "
+        "SELECT user_id, COUNT(*), SUM(waist), SUM(COALESCE(waist_risk, 0)), SUM(COALESCE(smoking, 0)), "
+        "SUM(COALESCE(drinking, 0)), SUM(COALESCE(exercise, 0)) FROM patient GROUP BY user_id"
+    )
+    op.execute(
+        "INSERT INTO waist_bucket (user_id, bucket, count) "
+        "SELECT user_id, CAST(waist AS INTEGER), COUNT(*) FROM patient GROUP BY user_id, CAST(waist AS INTEGER)"
+    )
+
+
+def downgrade():
+    op.drop_table('waist_bucket')
+    op.drop_table('user_summary')
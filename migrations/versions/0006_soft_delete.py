@@ -0,0 +1,47 @@
+"""soft delete
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 10:00:00.000000
+
+Adds patient.deleted_at, set instead of deleting the row when SOFT_DELETE is
+on. Hidden rows are removed later by `flask purge-deleted-patients`; the
+partial index lets the purge find them without scanning live rows.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A plain ADD COLUMN: no table rebuild, so the search triggers are untouched
+    op.add_column('patient', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_patient_deleted_at', 'patient', ['deleted_at'], unique=False,
+                    sqlite_where=sa.text('deleted_at IS NOT NULL'))
+
+
+def downgrade():
+    # Rows still waiting to be purged would otherwise reappear
+    op.execute("DELETE FROM patient WHERE deleted_at IS NOT NULL")
+    op.drop_index('ix_patient_deleted_at', table_name='patient')
+    with op.batch_alter_table('patient', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
+    # Dropping columns recreates the table, which drops its search triggers
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_insert AFTER INSERT ON patient BEGIN
+                      INSERT INTO patient_search (rowid, patient_id, name)
+                      VALUES (new.id, fold_search_text(new.patient_id), fold_search_text(new.name));
+                  END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_update AFTER UPDATE OF patient_id, name ON patient BEGIN
+                      UPDATE patient_search
+                      SET patient_id = fold_search_text(new.patient_id), name = fold_search_text(new.name)
+                      WHERE rowid = old.id;
+                  END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS patient_search_delete AFTER DELETE ON patient BEGIN
+                      DELETE FROM patient_search WHERE rowid = old.id;
+                  END""")
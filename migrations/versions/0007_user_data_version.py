@@ -0,0 +1,28 @@
+"""user data version
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 10:20:00.000000
+
+Adds user_summary.version, bumped by every change to a user's patients.
+The dashboard derives its ETag from it, so an unchanged dashboard can be
+answered with 304 without reading the patient table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user_summary', sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user_summary', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,49 @@
+"""measurements
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 10:40:00.000000
+
+Adds the append-only measurement table, one row per visit, so follow-up
+visits no longer need a new patient record. Every existing patient's
+registration vitals become the first measurement of their series.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('measurement',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('taken_at', sa.DateTime(), nullable=False),
+        sa.Column('height', sa.Float(), nullable=False),
+        sa.Column('weight', sa.Float(), nullable=False),
+        sa.Column('waist', sa.Float(), nullable=False),
+        sa.Column('systolic', sa.Integer(), nullable=True),
+        sa.Column('diastolic', sa.Integer(), nullable=True),
+        sa.Column('heart_rate', sa.Integer(), nullable=True),
+        sa.Column('bmi', sa.Float(), nullable=True),
+        sa.Column('waist_height_ratio', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['patient_id'], ['patient.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_measurement_patient_taken_at', 'measurement', ['patient_id', 'taken_at'], unique=False)
+    op.execute(
+        "INSERT INTO measurement (patient_id, taken_at, height, weight, waist, systolic, diastolic, heart_rate, "
+        "bmi, waist_height_ratio) "
+        "SELECT id, COALESCE(date_added, CURRENT_TIMESTAMP), height, weight, waist, systolic, diastolic, heart_rate, "
+        "bmi, waist_height_ratio FROM patient"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_measurement_patient_taken_at', table_name='measurement')
+    op.drop_table('measurement')
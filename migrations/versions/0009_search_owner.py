@@ -0,0 +1,68 @@
+"""search owner
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 09:00:00.000000
+
+Rebuilds the patient_search FTS5 table with an owner column ("u<user_id>u")
+so a search matches the user's own rows in the index, instead of every
+user's matches being read and then filtered by user_id. FTS5 tables cannot
+be altered, so the table and its triggers are recreated and refilled.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def drop_search_index():
+    op.execute("DROP TRIGGER IF EXISTS patient_search_delete")
+    op.execute("DROP TRIGGER IF EXISTS patient_search_update")
+    op.execute("DROP TRIGGER IF EXISTS patient_search_insert")
+    op.execute("DROP TABLE IF EXISTS patient_search")
+
+
+def upgrade():
+    drop_search_index()
+    op.execute("""CREATE VIRTUAL TABLE patient_search
+                  USING fts5(owner, patient_id, name, tokenize='trigram')""")
+    op.execute("""CREATE TRIGGER patient_search_insert AFTER INSERT ON patient BEGIN
+                      INSERT INTO patient_search (rowid, owner, patient_id, name)
+                      VALUES (new.id, 'u' || new.user_id || 'u', fold_search_text(new.patient_id),
+                              fold_search_text(new.name));
+                  END""")
+    op.execute("""CREATE TRIGGER patient_search_update AFTER UPDATE OF user_id, patient_id, name ON patient BEGIN
+                      UPDATE patient_search
+                      SET owner = 'u' || new.user_id || 'u',
+                          patient_id = fold_search_text(new.patient_id), name = fold_search_text(new.name)
+                      WHERE rowid = old.id;
+                  END""")
+    op.execute("""CREATE TRIGGER patient_search_delete AFTER DELETE ON patient BEGIN
+                      DELETE FROM patient_search WHERE rowid = old.id;
+                  END""")
+    op.execute("INSERT INTO patient_search (rowid, owner, patient_id, name) "
+               "SELECT id, 'u' || user_id || 'u', fold_search_text(patient_id), fold_search_text(name) FROM patient")
+
+
+def downgrade():
+    drop_search_index()
+    op.execute("""CREATE VIRTUAL TABLE patient_search
+                  USING fts5(patient_id, name, tokenize='trigram')""")
+    op.execute("""CREATE TRIGGER patient_search_insert AFTER INSERT ON patient BEGIN
+                      INSERT INTO patient_search (rowid, patient_id, name)
+                      VALUES (new.id, fold_search_text(new.patient_id), fold_search_text(new.name));
+                  END""")
+    op.execute("""CREATE TRIGGER patient_search_update AFTER UPDATE OF patient_id, name ON patient BEGIN
+                      UPDATE patient_search
+                      SET patient_id = fold_search_text(new.patient_id), name = fold_search_text(new.name)
+                      WHERE rowid = old.id;
+                  END""")
+    op.execute("""CREATE TRIGGER patient_search_delete AFTER DELETE ON patient BEGIN
+                      DELETE FROM patient_search WHERE rowid = old.id;
+                  END""")
+    op.execute("INSERT INTO patient_search (rowid, patient_id, name) "
+               "SELECT id, fold_search_text(patient_id), fold_search_text(name) FROM patient")
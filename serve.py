@@ -0,0 +1,228 @@
+"""Production entry point: a preforking HTTP server for the app.
+
+    python serve.py [--host 0.0.0.0] [--port 8080] [--workers N] [--graceful-timeout 30]
+
+The master opens the listening socket and runs the database migrations once,
+in a short-lived child process, then forks --workers processes (default: one
+per core) that share the socket. Each worker imports the app and warms it
+(database connections, compiled templates, translation catalogs) before it
+accepts connections. The master never imports the app itself, so a restart
+always loads the code currently on disk, and forking happens before any
+database connection or background thread exists.
+
+Signals to the master:
+    SIGHUP           graceful restart: migrate, start new workers, then drain the old ones
+    SIGTERM, SIGINT  graceful shutdown: drain all workers and exit
+Draining workers stop accepting, finish their in-flight requests and exit;
+any still running after --graceful-timeout are killed. Workers that die
+unexpectedly are replaced.
+
+Metrics are not aggregated across workers: each keeps its own /metrics
+histograms, so a scrape sees only the worker that answered it, and the
+counts restart with every new worker. Run with --workers 1 when the
+metrics must cover the whole server.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+class RequestHandler(WSGIRequestHandler):
+    # Seconds an idle keep-alive connection is held open; also bounds how long
+    # a draining worker waits for clients that keep their connection idle
+    timeout = 5
+
+
+def log(message):
+    print(f"[serve {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def run_migrations():
+    from main import app, init_db
+
+    with app.app_context():
+        init_db()
+
+
+def warm(app):
+    """Do the first-request work up front: connect to the database, compile templates, load catalogs."""
+    from flask_babel import force_locale, get_translations
+    from main import db, LANGUAGES, TEMPLATES
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.connect().close()
+        for name in TEMPLATES:
+            app.jinja_env.get_template(name)
+    with app.test_request_context():
+        for language in LANGUAGES:
+            with force_locale(language):
+                get_translations()
+
+
+def run_worker(listener, ready):
+    from main import app
+
+    warm(app)
+    server = make_server(*listener.getsockname()[:2], app, threaded=True,
+                         request_handler=RequestHandler, fd=listener.fileno())
+    # werkzeug makes request threads daemonic, which server_close() does not wait
+    # for and os._exit() kills mid-request; tracked threads are joined instead
+    server.daemon_threads = False
+
+    def drain(signum, frame):
+        # shutdown() waits for serve_forever() to return, so it cannot run on this thread
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, drain)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the master decides
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    os.write(ready, b"1")
+    os.close(ready)
+    server.serve_forever()
+    server.server_close()  # Joins the request threads still running; the master kills us after --graceful-timeout
+
+
+class Master:
+    def __init__(self, listener, args):
+        self.listener = listener
+        self.args = args
+        self.workers = {}  # pid -> generation
+        self.generation = 0
+        self.signals = []
+
+    def fork(self, target, *args):
+        pid = os.fork()
+        if pid == 0:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            status = 0
+            try:
+                target(*args)
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        return pid
+
+    def migrate(self):
+        _, status = os.waitpid(self.fork(run_migrations), 0)
+        return os.waitstatus_to_exitcode(status) == 0
+
+    def spawn(self):
+        """Fork a worker and wait until it is warm; returns False if it failed to start."""
+        read, write = os.pipe()
+        pid = self.fork(lambda: (os.close(read), run_worker(self.listener, write)))
+        os.close(write)
+        self.workers[pid] = self.generation
+        ready = os.read(read, 1)  # Empty if the worker died during warm-up
+        os.close(read)
+        return bool(ready)
+
+    def start_generation(self):
+        self.generation += 1
+        for _ in range(self.args.workers):
+            if not self.spawn():
+                return False
+        return True
+
+    def drain(self, pids):
+        for pid in pids:
+            self.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while any(pid in self.workers for pid in pids) and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in pids:
+            if pid in self.workers:
+                log(f"worker {pid} did not drain in time; killing it")
+                self.kill(pid, signal.SIGKILL)
+
+    def kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        """Collect exited workers; returns those of the current generation that exited."""
+        lost = []
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if self.workers.pop(pid, None) == self.generation:
+                lost.append(pid)
+        return lost
+
+    def restart(self):
+        log("restarting workers")
+        if not self.migrate():
+            log("migrations failed; keeping the current workers")
+            return
+        old = [pid for pid, generation in self.workers.items() if generation == self.generation]
+        if not self.start_generation():
+            log("new workers failed to start; keeping the current workers")
+            failed = [pid for pid, generation in self.workers.items() if generation == self.generation]
+            self.generation -= 1
+            self.drain(failed)
+            return
+        self.drain(old)
+        log(f"restarted with {self.args.workers} workers")
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+        if not self.migrate():
+            log("migrations failed")
+            return 1
+        if not self.start_generation():
+            log("workers failed to start")
+            self.drain(list(self.workers))
+            return 1
+        log(f"listening on {self.args.host}:{self.args.port} with {self.args.workers} workers")
+        while True:
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.restart()
+                else:
+                    log("shutting down")
+                    self.drain(list(self.workers))
+                    return 0
+            for pid in self.reap():
+                log(f"worker {pid} exited unexpectedly; replacing it")
+                time.sleep(1)  # Avoid a tight loop if workers crash on start
+                self.spawn()
+            time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backlog", type=int, default=2048, help="listen() queue length")
+    parser.add_argument("--graceful-timeout", type=float, default=30,
+                        help="seconds a draining worker gets to finish its requests")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    listener = socket.create_server((args.host, args.port), backlog=args.backlog)
+    listener.set_inheritable(True)
+    sys.exit(Master(listener, args).run())
+
+
+if __name__ == "__main__":
+    main()
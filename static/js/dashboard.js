@@ -0,0 +1,57 @@
+// Dashboard behaviour. Server-side values (waist table, risk thresholds and
+// translated messages) come from the JSON block rendered into the page, so
+// this file is identical for every user and locale and can be cached forever.
+const dashboardData = JSON.parse(document.getElementById('dashboard-data').textContent);
+
+const themeToggle = document.getElementById('theme-toggle');
+const html = document.documentElement;
+
+themeToggle.addEventListener('change', () => {
+    html.dataset.theme = themeToggle.checked ? 'dark' : 'light';
+});
+
+function calculateWaist(event) {
+    event.preventDefault();
+    const form = event.target;
+    const formData = new FormData(form);
+
+    const height = parseInt(formData.get('height'));
+    const weight = parseInt(formData.get('weight'));
+    const bodyType = formData.get('body_type');
+    const gender = formData.get('gender');
+
+    const waistData = dashboardData.waistData;
+    const riskThresholds = dashboardData.riskThresholds;
+
+    const baseWaist = waistData[bodyType];
+    const heightAdjustment = (height - 150) * 0.4;
+    const weightAdjustment = (weight - 45) * 0.5;
+    const totalWaist = baseWaist + heightAdjustment + weightAdjustment;
+    const waistResult = Math.round((totalWaist - 5) * 10) / 10;
+
+    document.getElementById('waistMeasurement').textContent = waistResult;
+    const warningElement = document.getElementById('waistWarning');
+
+    if (gender in riskThresholds && waistResult >= riskThresholds[gender]) {
+        warningElement.textContent = dashboardData.riskWarning;
+        warningElement.style.display = 'block';
+    } else {
+        warningElement.style.display = 'none';
+    }
+
+    document.getElementById('waistResult').style.display = 'block';
+}
+
+document.getElementById('waistCalculatorForm').addEventListener('submit', calculateWaist);
+
+// Long notes are cut short in the table; fetch the rest when asked
+document.querySelectorAll('.note-more').forEach((link) => {
+    link.addEventListener('click', async (event) => {
+        event.preventDefault();
+        const response = await fetch(link.dataset.url, { credentials: 'same-origin' });
+        if (response.ok) {
+            link.parentElement.querySelector('.note-text').textContent = (await response.json()).note;
+            link.remove();
+        }
+    });
+});
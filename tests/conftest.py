@@ -0,0 +1,78 @@
+"""Shared fixtures: the app on a throwaway SQLite database, emptied after every test.
+
+The app reads its storage profile and flags from the environment at import
+time, so this module sets them before importing main. Tests that need
+another configuration (the production profile, write coalescing) run their
+code in a fresh interpreter through the `isolated` fixture.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPORARY_DIRECTORY = tempfile.mkdtemp(prefix="waist-tests-")
+
+for name in ("STORAGE_PROFILE", "WRITE_COALESCING", "SOFT_DELETE", "SLOW_REQUEST_SECONDS"):
+    os.environ.pop(name, None)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(TEMPORARY_DIRECTORY, "test.db")
+os.environ["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"  # Keeps signups and logins fast
+sys.path.insert(0, ROOT)
+
+from main import app, db, init_db, PAGE_CACHE, User  # noqa: E402
+
+with app.app_context():
+    init_db()
+
+
+@pytest.fixture(autouse=True)
+def empty_database():
+    yield
+    with app.app_context():
+        db.session.remove()
+        with db.engine.begin() as connection:
+            for table in reversed(db.metadata.sorted_tables):
+                connection.execute(table.delete())
+            connection.exec_driver_sql("DELETE FROM patient_search")
+    PAGE_CACHE.clear()
+
+
+@pytest.fixture
+def user():
+    """Id of a freshly created user."""
+    with app.app_context():
+        account = User(username="tester", email="tester@example.com", password="x")
+        db.session.add(account)
+        db.session.commit()
+        return account.id
+
+
+@pytest.fixture
+def client(user):
+    """A test client logged in as `user`."""
+    test_client = app.test_client()
+    with test_client.session_transaction() as http_session:
+        http_session["user_id"] = user
+    return test_client
+
+
+@pytest.fixture
+def isolated():
+    """Run a function of a test module in a fresh interpreter with extra environment variables.
+
+    The function runs against its own database and prints a JSON result on
+    its last line of output, which is returned.
+    """
+    def run(path, function, **env):
+        directory = tempfile.mkdtemp(dir=TEMPORARY_DIRECTORY)
+        environment = dict(os.environ, DATABASE_URL="sqlite:///" + os.path.join(directory, "app.db"),
+                           PYTHONPATH=os.pathsep.join([ROOT, os.path.dirname(path)]), **env)
+        code = f"import runpy; runpy.run_path({path!r})[{function!r}]()"
+        result = subprocess.run([sys.executable, "-c", code], env=environment, capture_output=True, text=True,
+                                cwd=directory, timeout=300)
+        assert result.returncode == 0, result.stderr
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    return run
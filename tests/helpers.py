@@ -0,0 +1,10 @@
+"""Test data builders. Free of app imports, so isolated subprocesses can use them too."""
+
+
+def patient_record(patient_id, **fields):
+    """A valid patient record as the form, import and API accept it."""
+    record = dict(patient_id=patient_id, name=f"Patient {patient_id}", gender="Female", blood_pressure="120/80",
+                  heart_rate="70", height="165", weight="60", waist="80", smoking="No", drinking="No",
+                  exercise="Yes")
+    record.update(fields)
+    return record
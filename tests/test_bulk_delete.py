@@ -0,0 +1,58 @@
+import pytest
+
+from helpers import patient_record
+
+
+@pytest.fixture
+def patients(client):
+    """Ids of three patients: BMI 22 (not at risk), 33.1 and 40.4 (both at risk)."""
+    records = [
+        patient_record("LOW", name="Ayşe", weight="60", waist="80"),
+        patient_record("MID", name="Zeynep", weight="90", waist="95"),
+        patient_record("HIGH", name="Elif", weight="110", waist="110"),
+    ]
+    return [client.post("/api/v1/patients", json=record).json["id"] for record in records]
+
+
+def remaining(client):
+    return sorted(patient["patient_id"] for patient in client.get("/api/v1/patients?fields=patient_id").json["patients"])
+
+
+@pytest.mark.usefixtures("patients")
+@pytest.mark.parametrize("body, error", [
+    ({"filter": {}}, "at least one criterion"),
+    ({"filter": {"bmi_minimum": 30}}, "Unknown filters: bmi_minimum"),
+    ({"filter": {"bmi_min": "abc"}}, "bmi_min must be a number"),
+    ({"filter": {"bmi_min": True}}, "bmi_min must be a number"),
+    ({"filter": {"waist_max": None}}, "waist_max must be a number"),
+    ({"filter": {"at_risk": False}}, "at_risk must be true"),
+    ({"filter": {"at_risk": "yes"}}, "at_risk must be true"),
+    ({"filter": {"search": "  "}}, "search must be a non-empty string"),
+    ({"filter": []}, "filter must be an object"),
+    ({"ids": [1], "filter": {}}, "at least one criterion"),
+    ({"ids": "1"}, "ids must be an array of integers"),
+    ({}, "Expected"),
+])
+def test_invalid_requests_delete_nothing(client, body, error):
+    response = client.post("/api/v1/patients/delete", json=body)
+    assert response.status_code == 400
+    assert error in response.json["error"]
+    assert remaining(client) == ["HIGH", "LOW", "MID"]
+
+
+@pytest.mark.usefixtures("patients")
+@pytest.mark.parametrize("criteria, left", [
+    ({"bmi_min": 30}, ["LOW"]),
+    ({"at_risk": True, "waist_max": 100}, ["HIGH", "LOW"]),
+    ({"search": "zeynep"}, ["HIGH", "LOW"]),
+])
+def test_filter_deletes_only_matching_patients(client, criteria, left):
+    response = client.post("/api/v1/patients/delete", json={"filter": criteria})
+    assert response.json["deleted"] == 3 - len(left)
+    assert remaining(client) == left
+
+
+def test_ids_and_filter_are_combined(client, patients):
+    response = client.post("/api/v1/patients/delete", json={"ids": patients[:2], "filter": {"at_risk": True}})
+    assert response.json["deleted"] == 1
+    assert remaining(client) == ["HIGH", "LOW"]
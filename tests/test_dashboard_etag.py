@@ -0,0 +1,53 @@
+from helpers import patient_record
+
+
+def revalidate(client, etag, **headers):
+    return client.get("/dashboard", headers=dict(headers, **{"If-None-Match": etag}))
+
+
+def test_unchanged_dashboard_is_answered_with_304(client):
+    first = client.get("/dashboard")
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert "no-cache" in first.headers["Cache-Control"] and "private" in first.headers["Cache-Control"]
+    response = revalidate(client, first.headers["ETag"])
+    assert response.status_code == 304
+    assert response.headers["ETag"] == first.headers["ETag"]
+
+
+def test_changing_patients_changes_the_etag(client):
+    etag = client.get("/dashboard").headers["ETag"]
+    client.post("/api/v1/patients", json=patient_record("NEW"))
+    assert revalidate(client, etag).status_code == 200
+    patient_id = client.get("/api/v1/patients?fields=id").json["patients"][0]["id"]
+    etag = client.get("/dashboard").headers["ETag"]
+    client.delete(f"/api/v1/patients/{patient_id}")
+    assert revalidate(client, etag).status_code == 200
+
+
+def test_etag_depends_on_query_and_language(client):
+    etag = client.get("/dashboard").headers["ETag"]
+    assert client.get("/dashboard?at_risk=1").headers["ETag"] != etag
+    with client.session_transaction() as http_session:
+        http_session["language"] = "tr"
+    assert revalidate(client, etag).status_code == 200
+
+
+def test_etag_is_per_user(client, user):
+    from main import app, db, User
+
+    etag = client.get("/dashboard").headers["ETag"]
+    with app.app_context():
+        other = User(username="other", email="other@example.com", password="x")
+        db.session.add(other)
+        db.session.commit()
+        other_id = other.id
+    with client.session_transaction() as http_session:
+        http_session["user_id"] = other_id
+    assert revalidate(client, etag).status_code == 200
+
+
+def test_calculator_result_is_never_cached(client):
+    client.post("/dashboard", data=dict(calculate_waist="1", age="40", gender="Male", height="180",
+                                        weight="90", body_type="Normal"))
+    response = client.get("/dashboard")
+    assert response.status_code == 200 and "ETag" not in response.headers
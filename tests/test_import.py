@@ -0,0 +1,85 @@
+"""Bulk import: the per-row report, batching, and what counts as a duplicate or invalid record."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from helpers import patient_record
+from main import app, db, import_patients, load_summary, rebuild_summaries, Measurement, Patient, User
+
+
+@pytest.fixture
+def other_user():
+    with app.app_context():
+        account = User(username="other", email="other@example.com", password="x")
+        db.session.add(account)
+        db.session.commit()
+        return account.id
+
+
+def test_report_lists_duplicates_and_invalid_rows_by_row_number(user, other_user):
+    with app.app_context():
+        import_patients(other_user, [patient_record("TAKEN"), patient_record("HIDDEN")])
+        db.session.execute(db.update(Patient).where(Patient.patient_id == "HIDDEN").values(deleted_at=datetime.utcnow()))
+        db.session.commit()
+        report = import_patients(user, [
+            patient_record("A"),
+            patient_record("TAKEN"),  # Another user's patient ID
+            patient_record("B", height="nan"),
+            patient_record("A"),  # Repeated within the file
+            patient_record("HIDDEN"),  # Soft-deleted rows keep their ID until purged
+            patient_record("C", weight="inf"),
+            patient_record("D", waist="-Infinity"),
+            patient_record("E", height=""),
+            patient_record("F"),
+        ], batch_size=2)
+        stored = db.session.scalars(db.select(Patient.patient_id).where(Patient.user_id == user)).all()
+    assert report == {
+        "inserted": 2,
+        "duplicates": [{"row": 2, "patient_id": "TAKEN"}, {"row": 4, "patient_id": "A"},
+                       {"row": 5, "patient_id": "HIDDEN"}],
+        "invalid": [
+            {"row": 3, "error": "Invalid number: nan"},
+            {"row": 6, "error": "Invalid number: inf"},
+            {"row": 7, "error": "Invalid number: -Infinity"},
+            {"row": 8, "error": "Missing field: height"},
+        ],
+    }
+    assert sorted(stored) == ["A", "F"]
+
+
+def test_rows_are_inserted_one_statement_per_batch(user):
+    statements = []
+
+    def record_insert(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO patient "):
+            statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record_insert)
+        try:
+            report = import_patients(user, [patient_record(f"P{i}") for i in range(5)], batch_size=2)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record_insert)
+    assert report["inserted"] == 5
+    assert len(statements) == 3
+
+
+def test_skipped_rows_get_no_baseline_or_summary_entry(user):
+    with app.app_context():
+        import_patients(user, [patient_record("A", waist="95")])
+        import_patients(user, [patient_record("A", waist="95"), patient_record("B", waist="95")])
+        assert db.session.scalar(db.select(db.func.count()).select_from(Measurement)) == 2
+        incremental = load_summary(user)
+        with db.engine.begin() as connection:
+            rebuild_summaries(connection)
+        db.session.expire_all()
+        assert incremental == load_summary(user)
+    assert (incremental["patient_count"], incremental["at_risk_count"]) == (2, 2)
+
+
+@pytest.mark.parametrize("field", ["height", "weight", "waist"])
+def test_api_rejects_non_finite_measurements(client, field):
+    response = client.post("/api/v1/patients", json=patient_record("NAN", **{field: "NaN"}))
+    assert response.status_code == 400
+    assert response.json["error"] == "Invalid number: NaN"
@@ -0,0 +1,61 @@
+"""Login: session setup, rehashing outdated password hashes, and no connection held while hashing."""
+import pytest
+from werkzeug.security import generate_password_hash
+
+from main import app, db, password_hasher, User
+
+
+@pytest.fixture
+def account():
+    """Credentials of a user whose password is stored with weaker parameters than PASSWORD_HASH_METHOD."""
+    with app.app_context():
+        db.session.add(User(username="old", email="old@example.com",
+                            password=generate_password_hash("secret", "pbkdf2:sha256:500")))
+        db.session.commit()
+    return dict(email="old@example.com", password="secret")
+
+
+def stored_hash():
+    with app.app_context():
+        return db.session.scalar(db.select(User.password).where(User.email == "old@example.com"))
+
+
+def test_login_sets_the_session(account):
+    client = app.test_client()
+    response = client.post("/login", data=account)
+    assert response.headers["Location"] == "/dashboard"
+    with client.session_transaction() as http_session:
+        assert http_session["username"] == "old"
+
+
+def test_wrong_password_is_refused(account):
+    client = app.test_client()
+    response = client.post("/login", data=dict(account, password="wrong"))
+    assert response.status_code == 200
+    with client.session_transaction() as http_session:
+        assert "user_id" not in http_session
+        assert http_session["_flashes"] == [("danger", "Invalid email or password.")]
+
+
+def test_login_upgrades_outdated_hashes(account):
+    assert stored_hash().startswith("pbkdf2:sha256:500$")
+    assert app.test_client().post("/login", data=account).status_code == 302
+    upgraded = stored_hash()
+    assert upgraded.startswith(app.config["PASSWORD_HASH_METHOD"] + "$")
+    assert not password_hasher.needs_rehash(upgraded)
+    # The new hash still verifies, and is not rewritten again
+    assert app.test_client().post("/login", data=account).status_code == 302
+    assert stored_hash() == upgraded
+
+
+def test_no_database_connection_is_held_while_hashing(account, monkeypatch):
+    checked_out = []
+    verify = password_hasher.verify
+
+    def observed_verify(stored, password):
+        checked_out.append(db.engine.pool.checkedout())
+        return verify(stored, password)
+
+    monkeypatch.setattr(password_hasher, "verify", observed_verify)
+    app.test_client().post("/login", data=account)
+    assert checked_out == [0]
@@ -0,0 +1,67 @@
+"""The measurement trend: downsampling in SQL, single-bucket ranges and inclusive date bounds."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from helpers import patient_record
+from main import app, db, Measurement
+
+
+@pytest.fixture
+def patient(client):
+    return client.post("/api/v1/patients", json=patient_record("TREND")).json["id"]
+
+
+def add_measurements(patient_id, times, waists, heart_rate=60):
+    with app.app_context():
+        db.session.add_all([
+            Measurement(patient_id=patient_id, taken_at=taken_at, height=165, weight=60, waist=waist,
+                        heart_rate=heart_rate)
+            for taken_at, waist in zip(times, waists)
+        ])
+        db.session.commit()
+
+
+def trend(client, patient_id, **args):
+    response = client.get(f"/api/v1/patients/{patient_id}/measurements", query_string={"fields": "waist", **args})
+    assert response.status_code == 200
+    return response.json
+
+
+def test_ranges_longer_than_points_are_averaged_into_time_buckets(client, patient):
+    days = [datetime(2020, 1, 1) + timedelta(days=day) for day in range(30)]
+    add_measurements(patient, days, [80 + day for day in range(30)])
+    body = trend(client, patient, start="2020-01-01", end="2020-01-30", points=3, fields="waist,heart_rate")
+    assert body["measurements"] == 30
+    assert body["count"] == [10, 10, 10]
+    assert body["waist"] == [84.5, 94.5, 104.5]
+    assert body["heart_rate"] == [60, 60, 60]
+    assert body["taken_at"] == ["2020-01-05T12:00:00", "2020-01-15T12:00:00", "2020-01-25T12:00:00"]
+
+
+def test_ranges_within_points_come_back_unaggregated(client, patient):
+    days = [datetime(2020, 1, 1) + timedelta(days=day) for day in range(3)]
+    add_measurements(patient, days, [80, 81, 82])
+    body = trend(client, patient, start="2020-01-01", end="2020-01-03", points=3)
+    assert body == {"measurements": 3, "count": [1, 1, 1], "waist": [80.0, 81.0, 82.0],
+                    "taken_at": ["2020-01-01T00:00:00", "2020-01-02T00:00:00", "2020-01-03T00:00:00"]}
+
+
+def test_measurements_at_a_single_instant_form_one_bucket(client, patient):
+    add_measurements(patient, [datetime(2020, 3, 1, 9, 30)] * 4, [80, 81, 82, 83])
+    body = trend(client, patient, start="2020-03-01", end="2020-03-01", points=2)
+    assert body == {"measurements": 4, "count": [4], "waist": [81.5], "taken_at": ["2020-03-01T09:30:00"]}
+
+
+def test_empty_range(client, patient):
+    add_measurements(patient, [datetime(2020, 1, 1)], [80])
+    assert trend(client, patient, start="2019-01-01", end="2019-12-31", points=2) == {
+        "measurements": 0, "count": [], "waist": [], "taken_at": []}
+
+
+def test_end_date_includes_the_whole_day(client, patient):
+    times = [datetime(2020, 1, 4, 23, 59), datetime(2020, 1, 5), datetime(2020, 1, 5, 23, 59, 59),
+             datetime(2020, 1, 6)]
+    add_measurements(patient, times, [1, 2, 3, 4])
+    body = trend(client, patient, start="2020-01-05", end="2020-01-05")
+    assert body["waist"] == [2.0, 3.0]
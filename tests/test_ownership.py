@@ -0,0 +1,49 @@
+import pytest
+
+from helpers import patient_record
+from main import app, db, Patient, User
+
+
+@pytest.fixture
+def other_client():
+    with app.app_context():
+        other = User(username="other", email="other@example.com", password="x")
+        db.session.add(other)
+        db.session.commit()
+        other_id = other.id
+    test_client = app.test_client()
+    with test_client.session_transaction() as http_session:
+        http_session["user_id"] = other_id
+    return test_client
+
+
+@pytest.fixture
+def patient(client):
+    return client.post("/api/v1/patients", json=patient_record("MINE")).json["id"]
+
+
+@pytest.mark.parametrize("method, url", [
+    ("get", "/api/v1/patients/{}"),
+    ("delete", "/api/v1/patients/{}"),
+    ("get", "/api/v1/patients/{}/measurements"),
+    ("post", "/api/v1/patients/{}/measurements"),
+])
+def test_api_refuses_other_users_patients(other_client, patient, method, url):
+    response = getattr(other_client, method)(url.format(patient), json={"waist": 80, "weight": 60})
+    assert response.status_code == 403
+    assert response.json == {"error": "You are not authorized to access this patient."}
+    assert getattr(other_client, method)(url.format(patient + 1000), json={}).json == {"error": "Patient not found."}
+
+
+def test_delete_view_uses_the_same_check(other_client, client, patient):
+    response = other_client.get(f"/delete_patient/{patient}")
+    assert response.status_code == 302
+    with other_client.session_transaction() as http_session:
+        assert http_session["_flashes"] == [("danger", "You are not authorized to access this patient.")]
+    assert other_client.get(f"/delete_patient/{patient + 1000}").status_code == 404
+    with app.app_context():
+        assert db.session.get(Patient, patient) is not None
+
+    assert client.get(f"/delete_patient/{patient}").status_code == 302
+    with app.app_context():
+        assert db.session.get(Patient, patient) is None
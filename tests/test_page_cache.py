@@ -0,0 +1,29 @@
+import pytest
+
+from main import app, PAGE_CACHE
+
+
+@pytest.mark.parametrize("url", ["/", "/login", "/signup"])
+def test_cached_pages_revalidate_with_304(url):
+    client = app.test_client()
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+
+def test_pending_flashes_do_not_bypass_the_cache():
+    client = app.test_client()
+    client.post("/login", data=dict(email="nobody@example.com", password="wrong"))  # Flashes an error
+    with client.session_transaction() as http_session:
+        assert http_session["_flashes"]
+    response = client.get("/")
+    assert response.headers.get("ETag")
+    assert "no-cache" in response.headers["Cache-Control"]
+
+
+def test_cache_is_per_language():
+    client = app.test_client()
+    client.get("/")
+    client.get("/set_language/tr")
+    client.get("/")
+    assert set(PAGE_CACHE) == {("home", "en"), ("home", "tr")}
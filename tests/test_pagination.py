@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from helpers import patient_record
+from main import app, import_patients
+
+START = datetime(2026, 1, 1)
+
+
+def seed(user, count, same_time=False):
+    with app.app_context():
+        import_patients(user, [
+            dict(patient_record(f"P{i}"), date_added=(START if same_time else START + timedelta(hours=i)).isoformat())
+            for i in range(count)
+        ])
+
+
+def walk(client, **params):
+    """Follow next_cursor from the first page; returns the pages of patient ids."""
+    pages, after = [], None
+    while True:
+        body = client.get("/api/v1/patients", query_string=dict(params, fields="id", after=after or "")).json
+        pages.append([patient["id"] for patient in body["patients"]])
+        after = body["next_cursor"]
+        if not after:
+            return pages
+
+
+def test_pages_are_newest_first_without_gaps_or_repeats(client, user):
+    seed(user, 7)
+    pages = walk(client, per_page=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    ids = [patient_id for page in pages for patient_id in page]
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == 7
+
+
+def test_ties_on_date_added_are_broken_by_id(client, user):
+    seed(user, 5, same_time=True)
+    ids = [patient_id for page in walk(client, per_page=2) for patient_id in page]
+    assert ids == sorted(ids, reverse=True) and len(ids) == 5
+
+
+def test_before_cursor_returns_the_previous_page(client, user):
+    seed(user, 7)
+    first = client.get("/api/v1/patients", query_string=dict(per_page=3, fields="id")).json
+    second = client.get("/api/v1/patients", query_string=dict(per_page=3, fields="id", after=first["next_cursor"])).json
+    back = client.get("/api/v1/patients", query_string=dict(per_page=3, fields="id", before=second["prev_cursor"])).json
+    assert back["patients"] == first["patients"]
+    assert back["prev_cursor"] is None
+
+
+def test_per_page_is_clamped(client, user):
+    seed(user, 3)
+    assert len(client.get("/api/v1/patients?per_page=0").json["patients"]) == 1
+    app.config["MAX_PATIENTS_PER_PAGE"], limit = 2, app.config["MAX_PATIENTS_PER_PAGE"]
+    try:
+        assert len(client.get("/api/v1/patients?per_page=100").json["patients"]) == 2
+    finally:
+        app.config["MAX_PATIENTS_PER_PAGE"] = limit
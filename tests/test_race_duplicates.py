@@ -0,0 +1,93 @@
+"""Concurrent duplicate submissions: exactly one wins, the rest get the duplicate message.
+
+All client threads are released at once (a barrier) to submit the same email,
+the same username and the same patient ID. Uniqueness is enforced by the
+database constraints alone, so each race must end with one stored row, one
+success and clients-1 duplicate flashes. Each configuration runs in its own
+process, since the storage profile and write coalescing are read at import.
+"""
+import json
+import threading
+
+import pytest
+
+from helpers import patient_record
+
+CLIENTS = 6
+
+
+def race(submit):
+    """Run submit(number) on CLIENTS threads released together; return the results."""
+    barrier = threading.Barrier(CLIENTS)
+    results = [None] * CLIENTS
+
+    def run(number):
+        barrier.wait()
+        results[number] = submit(number)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def race_duplicates():
+    from main import app, db, init_db, Patient, User
+
+    with app.app_context():
+        init_db()
+        owner = User(username="owner", email="owner@example.com", password="x")
+        db.session.add(owner)
+        db.session.commit()
+        owner_id = owner.id
+    test_clients = []
+    for _ in range(CLIENTS):
+        test_client = app.test_client()
+        with test_client.session_transaction() as http_session:
+            http_session["user_id"] = owner_id
+        test_clients.append(test_client)
+
+    def submit(test_client, url, data):
+        response = test_client.post(url, data=data)
+        with test_client.session_transaction() as http_session:
+            messages = [message for _, message in http_session.pop("_flashes", [])]
+        return response.status_code, messages
+
+    races = {
+        "email": (
+            lambda n: submit(test_clients[n], "/signup", dict(username=f"user{n}", email="same@example.com", password="pw")),
+            "Email already registered.",
+            lambda: User.query.filter_by(email="same@example.com").count(),
+        ),
+        "username": (
+            lambda n: submit(test_clients[n], "/signup", dict(username="same", email=f"user{n}@example.com", password="pw")),
+            "Username already taken.",
+            lambda: User.query.filter_by(username="same").count(),
+        ),
+        "patient_id": (
+            lambda n: submit(test_clients[n], "/dashboard", dict(patient_record("RACE"), add_patient="true")),
+            "Patient ID already exists.",
+            lambda: Patient.query.filter_by(patient_id="RACE").count(),
+        ),
+    }
+    report = {}
+    for name, (attempt, duplicate_message, stored) in races.items():
+        results = race(attempt)
+        with app.app_context():
+            rows = stored()
+        report[name] = {
+            "rows": rows,
+            "duplicates": sum(duplicate_message in messages for _, messages in results),
+            "errors": sum(status >= 500 for status, _ in results),
+        }
+    print(json.dumps(report))
+
+
+@pytest.mark.parametrize("profile, coalescing", [("default", "0"), ("production", "0"), ("production", "1")])
+def test_one_winner_per_race(isolated, profile, coalescing):
+    report = isolated(__file__, "race_duplicates", STORAGE_PROFILE=profile, WRITE_COALESCING=coalescing,
+                      PASSWORD_HASH_METHOD="pbkdf2:sha256:1000")
+    for name, outcome in report.items():
+        assert outcome == {"rows": 1, "duplicates": CLIENTS - 1, "errors": 0}, name
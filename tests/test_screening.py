@@ -0,0 +1,97 @@
+"""The screen-patients job: resuming from its checkpoint after an interruption, and --update's at-risk deltas.
+
+The job is interrupted by making the second checkpoint save fail, after its
+chunk's report rows were written and its updates committed. The resumed run
+must redo that chunk without duplicating report rows or applying the
+at-risk deltas twice.
+"""
+import csv
+import os
+
+import pytest
+
+import main
+from helpers import patient_record
+from main import app, db, import_patients, load_summary, rebuild_summaries, Patient
+
+WAISTS = ["80", "95", "85", "100", "70", "90"]  # Female: at risk from 88
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def stale_patients(user):
+    """Six patients whose stored derived fields are out of date, with a summary matching what is stored."""
+    with app.app_context():
+        import_patients(user, [patient_record(f"S{i}", waist=waist, weight="90" if i == 4 else "60")
+                               for i, waist in enumerate(WAISTS)])
+        db.session.execute(db.update(Patient).values(bmi=None, waist_height_ratio=None, waist_risk=Patient.id % 2 == 0))
+        db.session.commit()
+        with db.engine.begin() as connection:
+            rebuild_summaries(connection)
+
+
+def screen(tmp_path, *args):
+    return app.test_cli_runner().invoke(args=[
+        "screen-patients", "--workers", "1", "--chunk-size", "2",
+        "--checkpoint", str(tmp_path / "checkpoint.json"), *args,
+    ])
+
+
+def read_report(path):
+    with open(path, newline="", encoding="utf-8") as report_file:
+        return list(csv.reader(report_file))
+
+
+def test_interrupted_run_resumes_from_its_checkpoint(tmp_path, user, stale_patients, monkeypatch):
+    report = tmp_path / "report.csv"
+    save_checkpoint, saves = main.save_checkpoint, []
+
+    def interrupt_on_second_save(path, state):
+        saves.append(state["last_id"])
+        if len(saves) == 2:
+            raise Interrupted
+        save_checkpoint(path, state)
+
+    monkeypatch.setattr(main, "save_checkpoint", interrupt_on_second_save)
+    result = screen(tmp_path, "--report", str(report), "--update")
+    assert isinstance(result.exception, Interrupted)
+    assert os.path.exists(tmp_path / "checkpoint.json")
+    with open(report, "a", encoding="utf-8") as report_file:
+        report_file.write("torn,row")  # As if the interruption cut a write short
+
+    monkeypatch.setattr(main, "save_checkpoint", save_checkpoint)
+    result = screen(tmp_path, "--report", str(report), "--update")
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith(f"Resuming after patient {saves[0]} (2 screened).")
+    assert "Done: 6 patients screened, 4 flagged" in result.output
+    assert not os.path.exists(tmp_path / "checkpoint.json")
+
+    # The resumed report equals one written by a single uninterrupted run
+    reference = tmp_path / "reference.csv"
+    assert screen(tmp_path, "--report", str(reference), "--restart").exit_code == 0
+    rows = read_report(report)
+    assert rows == read_report(reference)
+    assert [row[1] for row in rows[1:]] == ["S1", "S3", "S4", "S5"]
+
+    with app.app_context():
+        risks = db.session.execute(db.select(Patient.patient_id, Patient.waist_risk).order_by(Patient.id)).all()
+        assert [risk for _, risk in risks] == [int(waist) >= 88 for waist in WAISTS]
+        incremental = load_summary(user)
+        with db.engine.begin() as connection:
+            rebuild_summaries(connection)
+        db.session.expire_all()
+        assert incremental == load_summary(user)
+    assert incremental["at_risk_count"] == 3
+
+
+def test_checkpoint_from_other_options_is_refused(tmp_path, stale_patients):
+    options = dict(report=None, update=True, bmi_min=18.5, bmi_max=30.0)
+    main.save_checkpoint(str(tmp_path / "checkpoint.json"),
+                         dict(options=options, last_id=2, screened=2, flagged=0, updated=0, report_size=0))
+    result = screen(tmp_path, "--update")
+    assert result.exit_code == 1
+    assert "written with other options; pass --restart" in result.output
+    assert screen(tmp_path, "--update", "--restart").exit_code == 0
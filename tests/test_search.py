@@ -0,0 +1,69 @@
+import pytest
+
+from helpers import patient_record
+from main import app, fold_search_text, import_patients
+
+
+@pytest.mark.parametrize("text, folded", [
+    ("İSTANBUL", "istanbul"),
+    ("ISPARTA", "isparta"),
+    ("Işık", "işik"),
+    ("ILIK", "ilik"),
+    (None, ""),
+])
+def test_turkish_i_variants_fold_to_plain_i(text, folded):
+    assert fold_search_text(text) == folded
+
+
+@pytest.fixture
+def patients(user):
+    with app.app_context():
+        import_patients(user, [
+            patient_record("TR-1", name="IŞIK Yılmaz"),
+            patient_record("TR-2", name="İsmail Öztürk"),
+            patient_record("EN-1", name="Isaac Newton"),
+        ])
+
+
+def search(client, term):
+    body = client.get("/api/v1/patients", query_string=dict(search=term, fields="patient_id")).json
+    return sorted(patient["patient_id"] for patient in body["patients"])
+
+
+@pytest.mark.usefixtures("patients")
+@pytest.mark.parametrize("term, expected", [
+    ("ışık", ["TR-1"]),  # Trigram index
+    ("IŞIK", ["TR-1"]),
+    ("ismail", ["TR-2"]),
+    ("İs", ["EN-1", "TR-2"]),  # Shorter than a trigram: scanned with LIKE
+    ("tr-", ["TR-1", "TR-2"]),  # Matches the patient ID too
+    ("nobody", []),
+])
+def test_search_ignores_case_and_turkish_i(client, term, expected):
+    assert search(client, term) == expected
+
+
+def test_search_index_follows_renames(client, user, patients):
+    from main import db, Patient
+
+    with app.app_context():
+        patient = Patient.query.filter_by(patient_id="EN-1").one()
+        patient.name = "Ilgın Kaya"
+        db.session.commit()
+    assert search(client, "ilgin") == ["EN-1"]
+    assert search(client, "newton") == []
+
+
+
+def test_trigram_matches_are_scoped_to_the_user_in_the_index(user, patients):
+    from main import db, filter_by_search, Patient, User
+
+    with app.app_context():
+        other = User(username="other", email="other@example.com", password="x")
+        db.session.add(other)
+        db.session.commit()
+        import_patients(other.id, [patient_record("OT-1", name="Işık Demir")])
+        # No user_id filter on the query: only the MATCH itself can leave the other user's row out
+        found = filter_by_search(Patient.query, "ışık", user).with_entities(Patient.patient_id).all()
+        assert [patient_id for patient_id, in found] == ["TR-1"]
+        assert filter_by_search(Patient.query, "ışık", other.id).with_entities(Patient.patient_id).scalar() == "OT-1"
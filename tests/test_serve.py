@@ -0,0 +1,76 @@
+"""serve.py end to end: a real preforked server on a free port."""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pytest
+
+from conftest import ROOT, TEMPORARY_DIRECTORY
+
+SLOW_HASH = "pbkdf2:sha256:3000000"  # Makes every login take over a second
+
+
+@pytest.fixture
+def server():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    directory = tempfile.mkdtemp(dir=TEMPORARY_DIRECTORY)
+    environment = dict(os.environ, DATABASE_URL="sqlite:///" + os.path.join(directory, "serve.db"),
+                       PASSWORD_HASH_METHOD=SLOW_HASH)
+    master = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "serve.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "1", "--graceful-timeout", "10"],
+        env=environment, cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            urllib.request.urlopen(url + "/").close()
+            break
+        except OSError:
+            assert time.monotonic() < deadline and master.poll() is None, "server did not start"
+            time.sleep(0.1)
+    yield master, url
+    if master.poll() is None:
+        master.kill()
+        master.wait()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args):
+        return None
+
+
+def post(url, **fields):
+    opener = urllib.request.build_opener(NoRedirect)
+    try:
+        with opener.open(url, data=urllib.parse.urlencode(fields).encode(), timeout=30) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def test_sigterm_lets_in_flight_requests_finish(server):
+    master, url = server
+    assert post(url + "/signup", username="slow", email="slow@example.com", password="pw") == 302
+
+    results = []
+    login = threading.Thread(target=lambda: results.append(
+        post(url + "/login", email="slow@example.com", password="pw")))
+    login.start()
+    time.sleep(0.3)  # The login is now hashing
+    master.send_signal(signal.SIGTERM)
+    login.join()
+
+    assert results == [302]
+    assert master.wait(timeout=15) == 0
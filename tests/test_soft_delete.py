@@ -0,0 +1,58 @@
+import pytest
+
+from helpers import patient_record
+from main import app, db, Measurement, Patient
+
+
+@pytest.fixture(autouse=True)
+def soft_delete():
+    app.config["SOFT_DELETE"] = True
+    yield
+    app.config["SOFT_DELETE"] = False
+
+
+def create(client, patient_id):
+    return client.post("/api/v1/patients", json=patient_record(patient_id)).json["id"]
+
+
+def stored_rows():
+    with app.app_context():
+        return db.session.scalar(db.select(db.func.count()).select_from(Patient).execution_options(include_deleted=True))
+
+
+def test_deleted_patients_are_hidden_but_kept_until_purged(client):
+    hidden, kept = create(client, "HIDE"), create(client, "KEEP")
+    assert client.delete(f"/api/v1/patients/{hidden}").status_code == 204
+
+    assert client.get(f"/api/v1/patients/{hidden}").status_code == 404
+    assert [p["id"] for p in client.get("/api/v1/patients?fields=id").json["patients"]] == [kept]
+    assert client.get("/dashboard").status_code == 200
+    assert stored_rows() == 2
+    # The hidden row still holds its patient ID
+    assert client.post("/api/v1/patients", json=patient_record("HIDE")).status_code == 409
+
+
+def test_deleting_twice_removes_nothing(client):
+    patient = create(client, "ONCE")
+    assert client.post("/api/v1/patients/delete", json={"ids": [patient]}).json["deleted"] == 1
+    assert client.post("/api/v1/patients/delete", json={"ids": [patient]}).json["deleted"] == 0
+
+
+def test_purge_removes_hidden_patients_and_their_measurements(client):
+    hidden, kept = create(client, "HIDE"), create(client, "KEEP")
+    client.post(f"/api/v1/patients/{hidden}/measurements", json={"waist": 81, "weight": 61})
+    client.delete(f"/api/v1/patients/{hidden}")
+
+    result = app.test_cli_runner().invoke(args=["purge-deleted-patients", "--batch-size", "1"])
+    assert "Purged 1 patients." in result.output
+    assert stored_rows() == 1
+    with app.app_context():
+        assert db.session.scalars(db.select(Measurement.patient_id).distinct()).all() == [kept]
+    assert client.post("/api/v1/patients", json=patient_record("HIDE")).status_code == 201
+
+
+def test_purge_respects_older_than(client):
+    client.delete(f"/api/v1/patients/{create(client, 'RECENT')}")
+    result = app.test_cli_runner().invoke(args=["purge-deleted-patients", "--older-than", "60"])
+    assert "Purged 0 patients." in result.output
+    assert stored_rows() == 1
@@ -0,0 +1,46 @@
+"""The production profile sends GET queries to a read-only pool; writes made by GET views must still reach the writer."""
+import json
+
+import pytest
+
+from helpers import patient_record
+
+
+def delete_through_get():
+    from main import app, db, init_db, Patient, User
+
+    with app.app_context():
+        init_db()
+        owner = User(username="owner", email="owner@example.com", password="x")
+        db.session.add(owner)
+        db.session.commit()
+        owner_id = owner.id
+    client = app.test_client()
+    with client.session_transaction() as http_session:
+        http_session["user_id"] = owner_id
+    created = [client.post("/api/v1/patients", json=patient_record(f"P{i}")).json["id"] for i in range(2)]
+    deleted = client.get(f"/delete_patient/{created[0]}")
+    dashboard = client.get("/dashboard")
+    listed = client.get("/api/v1/patients?fields=id").json["patients"]
+    with app.app_context():
+        stored = db.session.scalar(db.select(db.func.count()).select_from(Patient)
+                                   .execution_options(include_deleted=True))
+        read_engine = "read" in db.engines
+    print(json.dumps({
+        "read_engine": read_engine,
+        "delete_status": deleted.status_code,
+        "dashboard_status": dashboard.status_code,
+        "listed": [patient["id"] for patient in listed],
+        "remaining": created[1:],
+        "stored": stored,
+    }))
+
+
+@pytest.mark.parametrize("soft_delete, stored", [("0", 1), ("1", 2)])
+def test_delete_patient_get_writes_under_production_profile(isolated, soft_delete, stored):
+    report = isolated(__file__, "delete_through_get", STORAGE_PROFILE="production", SOFT_DELETE=soft_delete)
+    assert report["read_engine"]
+    assert report["delete_status"] == 302
+    assert report["dashboard_status"] == 200
+    assert report["listed"] == report["remaining"]
+    assert report["stored"] == stored
@@ -0,0 +1,64 @@
+"""The per-user summary is kept up to date incrementally; it must always match a rebuild from scratch."""
+import pytest
+
+from helpers import patient_record
+from main import app, db, import_patients, load_summary, rebuild_summaries, UserSummary
+
+
+def summary_and_rebuild(user):
+    with app.app_context():
+        incremental = load_summary(user)
+        with db.engine.begin() as connection:
+            rebuild_summaries(connection)
+        db.session.expire_all()
+        return incremental, load_summary(user)
+
+
+def version(user):
+    with app.app_context():
+        return db.session.get(UserSummary, user).version
+
+
+@pytest.fixture
+def soft_delete(request):
+    app.config["SOFT_DELETE"] = request.param
+    yield
+    app.config["SOFT_DELETE"] = False
+
+
+@pytest.mark.parametrize("soft_delete", [False, True], indirect=True)
+@pytest.mark.usefixtures("soft_delete")
+def test_summary_follows_inserts_imports_and_deletes(client, user):
+    client.post("/api/v1/patients", json=patient_record("A", waist="95"))  # At risk (Female >= 88)
+    client.post("/dashboard", data=dict(patient_record("B", smoking="Yes"), add_patient="true"))
+    with app.app_context():
+        import_patients(user, [patient_record(f"I{i}", waist=str(70 + i)) for i in range(5)])
+    ids = [patient["id"] for patient in client.get("/api/v1/patients?fields=id").json["patients"]]
+    client.delete(f"/api/v1/patients/{ids[0]}")
+    client.post("/api/v1/patients/delete", json={"ids": ids[1:3]})
+
+    incremental, rebuilt = summary_and_rebuild(user)
+    assert incremental == rebuilt
+    assert incremental["patient_count"] == 4
+
+
+def test_summary_counts(client, user):
+    client.post("/api/v1/patients", json=patient_record("A", waist="95", smoking="Yes"))
+    client.post("/api/v1/patients", json=patient_record("B", waist="85", drinking="Yes"))
+    with app.app_context():
+        summary = load_summary(user)
+    assert summary["patient_count"] == 2
+    assert summary["waist_mean"] == 90.0
+    assert (summary["at_risk_count"], summary["smoker_count"], summary["drinker_count"]) == (1, 1, 1)
+    assert summary["exerciser_count"] == 2
+
+
+def test_every_change_and_rebuild_bumps_the_version(client, user):
+    client.post("/api/v1/patients", json=patient_record("A"))
+    first = version(user)
+    patient_id = client.get("/api/v1/patients?fields=id").json["patients"][0]["id"]
+    client.delete(f"/api/v1/patients/{patient_id}")
+    second = version(user)
+    with app.app_context(), db.engine.begin() as connection:
+        rebuild_summaries(connection)
+    assert first < second < version(user)
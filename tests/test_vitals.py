@@ -0,0 +1,53 @@
+import pytest
+
+from helpers import patient_record
+from main import app, Patient
+from vitals import parse_blood_pressure, parse_flag, parse_heart_rate
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("120/80", (120, 80)),
+    ("120-80", (120, 80)),
+    ("120 / 80", (120, 80)),
+    ("120/80 mmHg", (120, 80)),
+    (" 95\\60", (95, 60)),
+])
+def test_blood_pressure_formats(value, expected):
+    assert parse_blood_pressure(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [("72", 72), ("72 bpm", 72), ("72.0", 72), (72, 72), ("110", 110)])
+def test_heart_rate_formats(value, expected):
+    assert parse_heart_rate(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Yes", True), ("no", False), ("Evet", True), ("hayır", False), (True, True), (False, False), ("1", True),
+])
+def test_flag_formats(value, expected):
+    assert parse_flag(value) is expected
+
+
+@pytest.mark.parametrize("parse, value", [
+    (parse_blood_pressure, "120"), (parse_blood_pressure, "high"), (parse_heart_rate, "fast"), (parse_flag, "maybe"),
+    (parse_blood_pressure, "1200/80"), (parse_blood_pressure, "120/8000"), (parse_blood_pressure, "120/8000 mmHg"),
+    (parse_heart_rate, "1200"), (parse_heart_rate, "7200 bpm"),
+])
+def test_unreadable_values_raise_value_error(parse, value):
+    with pytest.raises(ValueError, match=str(value)):
+        parse(value)
+
+
+def test_dashboard_form_accepts_written_units(client):
+    response = client.post("/dashboard", data=dict(
+        patient_record("UNITS", blood_pressure="130-85 mmHg", heart_rate="64 bpm"), add_patient="true"))
+    assert response.status_code == 302
+    with app.app_context():
+        patient = Patient.query.filter_by(patient_id="UNITS").one()
+        assert (patient.systolic, patient.diastolic, patient.heart_rate) == (130, 85, 64)
+
+
+def test_api_reports_unreadable_values(client):
+    response = client.post("/api/v1/patients", json=patient_record("BAD", blood_pressure="high"))
+    assert response.status_code == 400
+    assert response.json["error"] == "Invalid blood pressure: high (expected e.g. 120/80)"
@@ -0,0 +1,52 @@
+import pytest
+
+import waist
+from waist import estimate_batch, estimate_waist, is_at_risk
+
+BODY_TYPES = ["Slim", "Normal", "Mild Obesity", "Obese", "Normal"]
+HEIGHTS = [150, 165.5, 180, 172, 190]
+WEIGHTS = [45, 60, 95.5, 110, 80]
+GENDERS = ["Female", "Male", "Female", "Male", "Male"]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def implementation(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(waist, "np", None)
+
+
+@pytest.mark.usefixtures("implementation")
+def test_batch_matches_the_single_estimate():
+    waists, at_risk = estimate_batch(BODY_TYPES, HEIGHTS, WEIGHTS, GENDERS)
+    expected = [estimate_waist(*row) for row in zip(BODY_TYPES, HEIGHTS, WEIGHTS)]
+    assert waists == expected
+    assert at_risk == [is_at_risk(gender, value) for gender, value in zip(GENDERS, expected)]
+
+
+@pytest.mark.usefixtures("implementation")
+@pytest.mark.parametrize("columns, message", [
+    ((["Huge"], [170], [70], ["Male"]), "Unknown value: Huge"),
+    ((["Slim"], [170], [70], ["Other"]), "Unknown value: Other"),
+    ((["Slim", "Slim"], [170], [70], ["Male"]), "same length"),
+])
+def test_batch_rejects_bad_input(columns, message):
+    with pytest.raises(ValueError, match=message):
+        estimate_batch(*columns)
+
+
+def test_estimate_api(client):
+    response = client.post("/api/v1/waist/estimate", json=dict(
+        body_type=BODY_TYPES, height=HEIGHTS, weight=WEIGHTS, gender=GENDERS))
+    assert response.json == dict(zip(("waist", "at_risk"), estimate_batch(BODY_TYPES, HEIGHTS, WEIGHTS, GENDERS)))
+    response = client.post("/api/v1/waist/estimate", json=dict(
+        body_type=["Slim"], height=["tall"], weight=[60], gender=["Male"]))
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("body", [dict(json=[1, 2]), dict(json="Slim"), dict(data="not json")])
+def test_estimate_api_requires_an_object(client, body):
+    response = client.post("/api/v1/waist/estimate", **body)
+    assert response.status_code == 400
+    assert response.json == {"error": "Expected a JSON object"}
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from helpers import patient_record
+from main import app, apply_write, db, parse_patient_fields, Patient
+
+
+@pytest.fixture(autouse=True)
+def write_coalescing():
+    app.config["WRITE_COALESCING"] = True
+    yield
+    app.config["WRITE_COALESCING"] = False
+
+
+def add(user, patient_id):
+    fields = parse_patient_fields(patient_record(patient_id))
+
+    def operation(session):
+        patient = Patient(user_id=user, **fields)
+        session.add(patient)
+        session.flush()
+        return patient.id
+    return operation
+
+
+def run_concurrently(operations):
+    """apply_write() each operation on its own thread; returns each result or raised exception."""
+    results = [None] * len(operations)
+
+    def run(index):
+        with app.app_context():
+            try:
+                results[index] = apply_write(operations[index])
+            except Exception as error:
+                results[index] = error
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(operations))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_each_caller_gets_its_own_result(user):
+    results = run_concurrently([add(user, f"Q{i}") for i in range(20)])
+    assert all(isinstance(result, int) for result in results)
+    assert len(set(results)) == 20
+    with app.app_context():
+        assert Patient.query.count() == 20
+
+
+def test_a_failing_write_does_not_undo_the_rest_of_its_batch(user):
+    results = run_concurrently([add(user, "DUP") for _ in range(4)] + [add(user, f"OK{i}") for i in range(4)])
+    assert sum(isinstance(result, IntegrityError) for result in results) == 3
+    with app.app_context():
+        assert sorted(db.session.scalars(db.select(Patient.patient_id))) == ["DUP", "OK0", "OK1", "OK2", "OK3"]
+
+
+def test_exceptions_are_raised_in_the_caller(user):
+    def fail(session):
+        raise ValueError("rejected")
+
+    with app.app_context(), pytest.raises(ValueError, match="rejected"):
+        apply_write(fail)
+    with app.app_context():
+        assert apply_write(add(user, "AFTER")) > 0
@@ -0,0 +1,53 @@
+"""Parsing of vitals as people type them, shared by the form, imports, the API and migration 0004.
+
+The form's blood pressure and heart rate inputs are free text, so the usual
+ways of writing a reading are accepted: "120/80", "120-80" and
+"120/80 mmHg"; "72", "72 bpm" and "72.0". Lifestyle flags accept yes/no
+in English and Turkish as well as JSON booleans. Measurements (height,
+weight, waist) are plain numbers; "nan" and "inf", which float() accepts,
+are not.
+"""
+import math
+import re
+
+# (?!\d) stops a longer number from being read by its first digits ("1200" is not 120)
+BLOOD_PRESSURE = re.compile(r"^\s*(\d{2,3})(?!\d)\s*[/\\-]\s*(\d{2,3})(?!\d)")
+HEART_RATE = re.compile(r"^\s*(\d{2,3})(?!\d)")
+TRUE_VALUES = {"yes", "y", "true", "1", "evet"}
+FALSE_VALUES = {"no", "n", "false", "0", "hayır", "hayir"}
+
+
+def parse_blood_pressure(value):
+    """Read a reading such as "120/80" as (systolic, diastolic) integers; raises ValueError."""
+    match = BLOOD_PRESSURE.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid blood pressure: {value} (expected e.g. 120/80)")
+    return int(match[1]), int(match[2])
+
+
+def parse_heart_rate(value):
+    """Read a heart rate such as "72" or "72 bpm" as an integer; raises ValueError."""
+    match = HEART_RATE.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid heart rate: {value} (expected e.g. 72)")
+    return int(match[1])
+
+
+def parse_measurement(value):
+    """Read a measurement such as "172.5" as a finite float; raises ValueError."""
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid number: {value}")
+    return number
+
+
+def parse_flag(value):
+    """Read a lifestyle flag: the form's "Yes"/"No" and its variants, or a JSON boolean; raises ValueError."""
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"Expected Yes or No, got: {value}")
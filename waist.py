@@ -0,0 +1,91 @@
+"""Waist measurement estimation and cardiovascular risk thresholds.
+
+This is the single source for the calculation: the dashboard calculator form,
+the batch estimate API and the dashboard JavaScript (through the template
+globals) all use the table and thresholds defined here.
+
+estimate_batch uses NumPy when it is installed. NumPy is optional and not a
+dependency. Without it, the batch is computed in a plain Python loop: the
+results are the same, but there is no vectorized speed-up over calling
+estimate_waist per row.
+"""
+try:
+    import numpy as np
+except ImportError:  # Optional, not a dependency: estimate_batch falls back to a Python loop
+    np = None
+
+# Simulated Waist Data Based on Body Type
+WAIST_DATA = {
+    "Slim": 60,
+    "Normal": 70,
+    "Mild Obesity": 80,
+    "Obese": 90,
+}
+
+# Waist measurement (cm) at or above which cardiovascular risk is flagged
+RISK_THRESHOLDS = {
+    "Male": 102,
+    "Female": 88,
+}
+
+def estimate_waist(body_type, height, weight):
+    base_waist = WAIST_DATA[body_type]
+    height_adjustment = (height - 150) * 0.4  # 0.4 cm per 1 cm above 150
+    weight_adjustment = (weight - 45) * 0.5  # 0.5 cm per 1 kg above 45
+    total_waist = base_waist + height_adjustment + weight_adjustment
+    return round(total_waist - 5, 1)  # Adjusted to reduce by 5 cm
+
+def is_at_risk(gender, waist):
+    threshold = RISK_THRESHOLDS.get(gender)
+    return threshold is not None and waist >= threshold
+
+def body_metrics(height, weight, waist, gender):
+    """Derived fields stored on each patient: BMI, waist-to-height ratio and waist risk."""
+    if not height or height <= 0:
+        return {"bmi": None, "waist_height_ratio": None, "waist_risk": is_at_risk(gender, waist)}
+    return {
+        "bmi": round(weight / (height / 100) ** 2, 1),
+        "waist_height_ratio": round(waist / height, 3),
+        "waist_risk": is_at_risk(gender, waist),
+    }
+
+def estimate_batch(body_types, heights, weights, genders):
+    """Estimate waists and risk flags for parallel input sequences.
+
+    Returns (waists, at_risk) as lists. Raises ValueError for an unknown body
+    type or gender, or when the sequences differ in length. With NumPy
+    installed the formula runs on whole columns at once; otherwise it is one
+    Python loop over the rows, with the same results.
+    """
+    count = len(body_types)
+    if not len(heights) == len(weights) == len(genders) == count:
+        raise ValueError("body_type, height, weight and gender must have the same length")
+    try:
+        base = [WAIST_DATA[body_type] for body_type in body_types]
+        thresholds = [RISK_THRESHOLDS[gender] for gender in genders]
+    except KeyError as e:
+        raise ValueError(f"Unknown value: {e.args[0]}") from None
+
+    if np is not None:
+        waists = np.round(np.asarray(base, dtype=float) + (np.asarray(heights, dtype=float) - 150) * 0.4
+                          + (np.asarray(weights, dtype=float) - 45) * 0.5 - 5, 1)
+        return waists.tolist(), (waists >= np.asarray(thresholds, dtype=float)).tolist()
+
+    waists = [round(b + (float(h) - 150) * 0.4 + (float(w) - 45) * 0.5 - 5, 1)
+              for b, h, w in zip(base, heights, weights)]
+    return waists, [waist >= threshold for waist, threshold in zip(waists, thresholds)]
+
+def screen_batch(rows, bmi_min, bmi_max):
+    """Score (height, weight, waist, gender) rows with body_metrics for population screening.
+
+    Returns one (bmi, waist_height_ratio, waist_risk, bmi_out_of_range) tuple
+    per row, where the BMI range is [bmi_min, bmi_max). Free of app state, so
+    process pool workers can run it without importing the app.
+    """
+    results = []
+    for height, weight, waist, gender in rows:
+        metrics = body_metrics(height, weight, waist, gender)
+        bmi = metrics["bmi"]
+        results.append((bmi, metrics["waist_height_ratio"], metrics["waist_risk"],
+                        bmi is not None and not bmi_min <= bmi < bmi_max))
+    return results
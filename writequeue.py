@@ -0,0 +1,88 @@
+"""Group commit for patient writes.
+
+Request threads hand their mutations to a single writer thread, which applies
+everything that has queued up within a few milliseconds (or up to a batch
+limit) in one transaction. Each mutation runs in its own SAVEPOINT, so a
+duplicate patient ID only fails that caller, and every caller gets back its
+own result or exception. The whole batch then shares one commit, and one
+fsync, instead of paying for one each.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WriteQueue:
+    def __init__(self, app, db, max_batch=64, max_delay=0.005, timeout=30):
+        self.app = app
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, operation):
+        """Queue operation(session) for the next batch and wait for its result.
+
+        Exceptions raised by the operation, such as IntegrityError, are
+        re-raised in the calling thread.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((operation, future))
+        return future.result(timeout=self.timeout)
+
+    def _ensure_started(self):
+        # Started lazily so that forked worker processes each get their own writer
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        with self.app.app_context():
+            session = self.db.session
+            while True:
+                batch = self._next_batch()
+                results = []
+                try:
+                    # pysqlite only opens a transaction before DML, so a SAVEPOINT
+                    # issued first would become the outer transaction and RELEASE
+                    # would commit it. Take the write lock explicitly instead.
+                    session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+                    for operation, future in batch:
+                        try:
+                            # Flushed on exit, so constraint errors surface here
+                            with session.begin_nested():
+                                result = operation(session)
+                        except Exception as e:
+                            results.append((future, None, e))
+                        else:
+                            results.append((future, result, None))
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    results = [(future, None, e) for _, future in batch]
+                finally:
+                    session.close()
+                for future, result, error in results:
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)